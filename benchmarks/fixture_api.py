@@ -0,0 +1,111 @@
+"""
+Local stand-in of the Article Search endpoint, used with NYT_SEARCH_URL to run the HTTP backend
+without network access nor api key.
+
+It serves the pages of fixtures/articlesearch.json, a list of responses in the format of the
+endpoint (10 articles per page, the last one shorter):
+
+    /svc/search/v2/articlesearch.json?page=N   the response of page N, an empty page after the last
+
+Pages listed in `rate_limited_pages` answer 429 with a Retry-After header the first time they are
+requested, and `status` makes every request fail with that status.
+"""
+import os
+import json
+import threading
+import http.server
+from urllib.parse import urlparse, parse_qs
+
+FIXTURE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "fixtures", "articlesearch.json")
+SEARCH_PATH = "/svc/search/v2/articlesearch.json"
+
+
+class FixtureApi:
+    def __init__(
+        self,
+        path: str = FIXTURE_PATH,
+        rate_limited_pages: list = None,
+        retry_after: int = 0,
+        status: int = None
+    ):
+        """
+        :param path: Json file with the list of responses, one per page
+        :param rate_limited_pages: Pages that answer 429 the first time they are requested
+        :param retry_after: Seconds sent in the Retry-After header of the 429 responses
+        :param status: Error status of every response, None to serve the pages
+        """
+        with open(path) as handler:
+            self.pages = json.load(handler)
+        self.rate_limited_pages = set(rate_limited_pages or [])
+        self.retry_after = retry_after
+        self.status = status
+        # query parameters of every request, in order
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = None
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:%s%s" % (self.server.server_port, SEARCH_PATH)
+
+    def handle(self, path: str):
+        """
+        This function returns the status, headers and body of a request.
+        """
+        parsed = urlparse(path)
+        if parsed.path != SEARCH_PATH:
+            return 404, {}, b'{"fault": "not found"}'
+
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        page = int(params.get("page", 0))
+        with self.lock:
+            self.requests.append(params)
+            if page in self.rate_limited_pages:
+                self.rate_limited_pages.discard(page)
+                return 429, {"Retry-After": str(self.retry_after)}, b'{"fault": "rate limited"}'
+
+        if self.status is not None:
+            return self.status, {}, b'{"fault": "server error"}'
+        if page < len(self.pages):
+            body = self.pages[page]
+        else:
+            body = {"status": "OK", "response": {"docs": [], "meta": {"offset": page * 10}}}
+        return 200, {}, json.dumps(body).encode()
+
+    def start(self) -> "FixtureApi":
+        api = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                status, headers, body = api.handle(self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self) -> "FixtureApi":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
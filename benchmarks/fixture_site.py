@@ -0,0 +1,184 @@
+"""
+Local stand-in of the search page, used by the benchmarks to run without network access.
+
+The pages use the same `data-testid` and class markup that the XPaths of `robot_tasks.parsing`,
+`robot_tasks.scraping` and `robot_tasks.filtering` expect:
+
+    /search          first page of results, with the section and type filters and a "show more"
+                     button that appends the next page through javascript
+    /results?start=N html of the page of results starting at N, requested by the button
+    /all             every result in a single page, to benchmark extraction without pagination
+    /images/<name>   a fake image of about `image_size` bytes for every rendition of every result
+"""
+import threading
+import http.server
+from datetime import date
+from html import escape
+from urllib.parse import urlparse, parse_qs
+
+# Results appended by every "show more" click, like the real search page
+PAGE_SIZE = 10
+
+SECTIONS = ["Business", "Technology", "World", "U.S.", "Opinion"]
+TYPES = ["Article", "Blog", "Video", "Interactive Feature"]
+
+DESCRIPTIONS = [
+    "The company raised $%s million in a new funding round.",
+    "Shares closed at $%s.25 on Friday after the report.",
+    "A deal worth %s USD was announced by the regulators.",
+    "Prices rose %s percent in the last month."
+    ]
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><title>Search results</title></head>
+<body>
+<form>
+<div data-testid="section"><button type="button">Section</button></div>
+<div data-testid="type"><button type="button">Type</button></div>
+<ul>%(filters)s</ul>
+</form>
+<ol data-testid="search-results">%(results)s</ol>
+%(button)s
+<script>
+const button = document.querySelector("[data-testid='search-show-more-button']");
+let next = %(page_size)s;
+if (button) {
+    button.addEventListener("click", async () => {
+        const response = await fetch("/results?start=" + next);
+        document.querySelector("ol").insertAdjacentHTML("beforeend", await response.text());
+        next += %(page_size)s;
+        if (next >= %(total)s) {
+            button.remove();
+        }
+    });
+}
+</script>
+</body>
+</html>
+"""
+
+RESULT_TEMPLATE = """
+<li data-testid="search-bodega-result">
+<div><span data-testid="todays-date">%(date)s</span></div>
+<div>
+<a href="/article/%(index)s"><h4>%(title)s</h4></a>
+<p class="css-16nhkrn">%(description)s</p>
+</div>
+<figure><img class="css-rq4mmj" src="/images/%(stem)s-threeByTwoMediumAt2X.jpg?quality=75&amp;auto=webp"
+srcset="/images/%(stem)s-threeByTwoSmallAt2X.jpg?quality=75&amp;auto=webp 600w,
+/images/%(stem)s-threeByTwoMediumAt2X.jpg?quality=75&amp;auto=webp 1200w,
+/images/%(stem)s-superJumbo.jpg?quality=75&amp;auto=webp 2048w"
+sizes="(min-width: 1024px) 205px, 600px" alt=""></figure>
+</li>"""
+
+FILTER_TEMPLATE = """
+<li class="css-1qtb2wd"><label class="css-1a8ayg6"><input type="checkbox">
+<span class="css-16eo56s">%(name)s<span class="css-17fq56o">%(count)s</span></span></label></li>"""
+
+SHOW_MORE_BUTTON = '<button type="button" data-testid="search-show-more-button">Show More</button>'
+
+
+def get_image_stem(index: int) -> str:
+    return "result-%s" % index
+
+
+def render_result(index: int, today: date) -> str:
+    published = today.strftime("%B ") + str(today.day) + today.strftime(", %Y")
+    return RESULT_TEMPLATE % {
+        "index": index,
+        "date": published,
+        "title": escape("Benchmark result %s about the economy" % index),
+        "description": escape(DESCRIPTIONS[index % len(DESCRIPTIONS)] % (index + 1)),
+        "stem": get_image_stem(index)
+        }
+
+
+class FixtureSite:
+    def __init__(self, results: int, image_size: int = 8192, page_size: int = PAGE_SIZE):
+        """
+        :param results: Number of search results served by the site
+        :param image_size: Size in bytes of every image
+        :param page_size: Results added by every "show more" click
+        """
+        self.results = results
+        self.page_size = page_size
+        self.image = bytes(index % 251 for index in range(image_size))
+        today = date.today()
+        # rendered once, so the server doesn't add noise to the timings
+        self.rendered = [render_result(index, today) for index in range(results)]
+        self.filters = "".join(
+            FILTER_TEMPLATE % {"name": escape(name), "count": 1000 + position}
+            for position, name in enumerate(SECTIONS + TYPES)
+            )
+        self.server = None
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:%s/" % self.server.server_port
+
+    def render_page(self, count: int, button: bool) -> str:
+        return PAGE_TEMPLATE % {
+            "filters": self.filters,
+            "results": "".join(self.rendered[:count]),
+            "button": SHOW_MORE_BUTTON if button else "",
+            "page_size": self.page_size,
+            "total": self.results
+            }
+
+    def handle(self, path: str):
+        """
+        This function returns the status, content type and body of a request.
+        """
+        parsed = urlparse(path)
+        if parsed.path == "/search":
+            page = self.render_page(self.page_size, self.results > self.page_size)
+            return 200, "text/html; charset=utf-8", page.encode()
+        if parsed.path == "/all":
+            return 200, "text/html; charset=utf-8", self.render_page(self.results, False).encode()
+        if parsed.path == "/results":
+            start = int(parse_qs(parsed.query).get("start", ["0"])[0])
+            fragment = "".join(self.rendered[start:start+self.page_size])
+            return 200, "text/html; charset=utf-8", fragment.encode()
+        if parsed.path.startswith("/images/"):
+            # every image has different content, identical images would be stored once
+            return 200, "image/jpeg", parsed.path.encode() + self.image
+        return 404, "text/plain", b"not found"
+
+    def start(self) -> "FixtureSite":
+        site = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body are written separately, without this every keep-alive response waits
+            # for the delayed ack of the client
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                status, content_type, body = site.handle(self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self) -> "FixtureSite":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
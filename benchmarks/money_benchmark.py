@@ -0,0 +1,52 @@
+"""
+Micro-benchmark of the money detection of `calculations.analyze_money`.
+
+Usage:
+    python -m benchmarks.money_benchmark --rows 100000 --repeat 5
+"""
+import argparse
+import random
+import time
+
+from robot_tasks.calculations import analyze_money
+
+TEMPLATES = [
+    "Company raised $%s million in a new funding round",
+    "Shares closed at $%s.25 on Friday",
+    "The fine was %s dollars according to the report",
+    "A deal worth %s USD was announced",
+    "Prices rose %s percent in the last month",
+    "Regulators met %s times before the decision"
+    ]
+
+
+def build_texts(rows: int, seed: int = 42) -> list:
+    randomizer = random.Random(seed)
+    return [
+        randomizer.choice(TEMPLATES) % randomizer.randint(1, 100000)
+        for _ in range(rows)
+        ]
+
+
+def run(rows: int, repeat: int) -> dict:
+    texts = build_texts(rows)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        analyze_money(texts)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    return {"rows": rows, "best_seconds": best, "rows_per_second": rows / best}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    result = run(args.rows, args.repeat)
+    print(
+        "%(rows)s rows in %(best_seconds).3fs: %(rows_per_second).0f rows/s" % result
+        )
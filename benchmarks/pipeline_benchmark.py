@@ -0,0 +1,207 @@
+"""
+Benchmark of every stage of the pipeline against the local fixture site, at several scales.
+
+Stages: pagination and extraction in the browser (only with --browser, it needs Chrome), extraction
+of a saved page with lxml, `get_calculated_data`, `CreateWorkbook`, `download_images` and
+`zip_images`. The results are written as json to benchmarks/results/ so runs can be compared, and
+--baseline prints the ratio against a previous run.
+
+Usage:
+    python -m benchmarks.pipeline_benchmark --scales 100 1000 10000 --repeat 3
+    python -m benchmarks.pipeline_benchmark --browser --baseline benchmarks/results/<file>.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+
+import requests
+
+from robot_tasks.config import RunConfig
+from robot_tasks.parsing import parse_results
+from robot_tasks.calculations import get_calculated_data
+from robot_tasks.excel import CreateWorkbook
+from robot_tasks.downloading import download_images
+from robot_tasks.metrics import reset_metrics
+from robot_tasks.utils import get_output_path
+
+from benchmarks.fixture_site import FixtureSite
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SCALES = [100, 1000, 10000]
+# Suffix of the files written by the benchmark in the output directory
+SUFFIX = "_benchmark"
+
+
+def best_of(repeat: int, function, *args) -> tuple:
+    """
+    This function runs `function` `repeat` times and returns the best time and the last result.
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def record(results: list, stage: str, scale: int, seconds: float) -> None:
+    results.append({
+        "stage": stage,
+        "scale": scale,
+        "seconds": seconds,
+        "items_per_second": scale / seconds if seconds > 0 else None
+        })
+    logging.info("[benchmark] %s x%s: %.3fs" % (stage, scale, seconds))
+
+
+def bench_browser(site: FixtureSite, scale: int, results: list) -> None:
+    """
+    This function measures the pagination of the search page and both browser extraction paths.
+    """
+    from RPA.Browser.Selenium import Selenium
+    from robot_tasks.scraping import (
+        get_all_results,
+        get_data_from_entries_bulk,
+        get_data_from_page_source)
+
+    browser = Selenium()
+    browser.open_available_browser(site.url + "search", headless=True)
+    try:
+        start = time.perf_counter()
+        loaded = get_all_results(browser)
+        record(results, "pagination", scale, time.perf_counter() - start)
+        if loaded != scale:
+            logging.error("Pagination loaded %s of %s results" % (loaded, scale))
+
+        seconds, _ = best_of(1, get_data_from_entries_bulk, browser)
+        record(results, "extraction_script", scale, seconds)
+        seconds, _ = best_of(1, get_data_from_page_source, browser)
+        record(results, "extraction_page_source", scale, seconds)
+    finally:
+        browser.close_browser()
+
+
+def create_workbook(data: list) -> str:
+    return CreateWorkbook(data, "benchmark", write_only=True, suffix=SUFFIX).create_excel_file()
+
+
+def bench_downloads(images_data: list, scale: int, results: list, workers: int) -> None:
+    """
+    This function measures `download_images` with the images saved in a folder, the timings of the
+    download and zip stages are taken from the run metrics.
+    """
+    output_path = get_output_path()
+    image_folder = os.path.join(output_path, "images")
+    shutil.rmtree(image_folder, ignore_errors=True)
+    # created by `general.init_process` in a real run
+    os.makedirs(image_folder)
+
+    metrics = reset_metrics()
+    archive_path = download_images(
+        images_data,
+        workers=workers,
+        use_cache=False,
+        archive_name="images" + SUFFIX
+        )
+    stages = metrics.to_dict()["stages"]
+    record(results, "download_images", scale, stages["download"]["seconds"])
+    record(results, "zip_images", scale, stages["zip"]["seconds"])
+
+    shutil.rmtree(image_folder, ignore_errors=True)
+    os.remove(archive_path)
+
+
+def run_scale(scale: int, repeat: int, browser: bool, image_size: int, workers: int) -> list:
+    results = []
+    with FixtureSite(scale, image_size) as site:
+        if browser:
+            bench_browser(site, scale, results)
+
+        page_source = requests.get(site.url + "all").text
+        seconds, data = best_of(repeat, parse_results, page_source, site.url)
+        record(results, "extraction_lxml", scale, seconds)
+
+        config = RunConfig(search="economy", category_or_section=[], months=1)
+        seconds, calculated = best_of(repeat, get_calculated_data, data, config)
+        record(results, "get_calculated_data", scale, seconds)
+        data_with_extra_info, images_data = calculated
+
+        seconds, results_path = best_of(repeat, create_workbook, data_with_extra_info)
+        record(results, "create_workbook", scale, seconds)
+        os.remove(results_path)
+
+        bench_downloads(images_data, scale, results, workers)
+    return results
+
+
+def compare(results: list, baseline_path: str) -> None:
+    """
+    This function prints the time of every stage against the same stage of a previous run.
+    """
+    with open(baseline_path) as handler:
+        baseline = {
+            (result["stage"], result["scale"]): result["seconds"]
+            for result in json.load(handler)["results"]
+            }
+
+    for result in results:
+        previous = baseline.get((result["stage"], result["scale"]))
+        if previous:
+            print("%-24s x%-6s %8.3fs  %5.2fx baseline" % (
+                result["stage"], result["scale"], result["seconds"], result["seconds"] / previous))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--browser", action="store_true", help="also benchmark the browser stages")
+    parser.add_argument("--image-size", type=int, default=8192)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--output", default=RESULTS_PATH, help="directory of the json results")
+    parser.add_argument("--baseline", help="json results of a previous run to compare with")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # the benchmark cleans its images and archives, a bot running in the project keeps its output
+    os.environ["ROBOT_ARTIFACTS"] = tempfile.mkdtemp(prefix="pipeline_benchmark_")
+
+    started_at = datetime.now()
+    results = []
+    try:
+        for scale in args.scales:
+            results.extend(
+                run_scale(scale, args.repeat, args.browser, args.image_size, args.workers))
+    finally:
+        shutil.rmtree(get_output_path(), ignore_errors=True)
+
+    os.makedirs(args.output, exist_ok=True)
+    final_path = os.path.join(
+        args.output, "pipeline_%s.json" % started_at.strftime("%Y%m%d_%H%M%S"))
+    with open(final_path, "w") as handler:
+        json.dump({
+            "started_at": started_at.isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "arguments": vars(args),
+            "results": results
+            }, handler, indent=2)
+
+    for result in results:
+        print("%-24s x%-6s %8.3fs" % (result["stage"], result["scale"], result["seconds"]))
+    print("Results written to %s" % final_path)
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import os
+import time
+import logging
+from datetime import datetime, timezone
+
+import requests
+
+from .filtering import get_search_months
+from .parsing import build_news_data, format_result_date
+from .config import RunConfig, get_config
+
+# Article Search endpoint. NYT_SEARCH_URL points it to another server, like a local stand-in
+SEARCH_URL = "https://api.nytimes.com/svc/search/v2/articlesearch.json"
+IMAGES_URL = "https://static01.nyt.com/"
+# The endpoint returns 10 results per page and doesn't serve pages after 100
+PAGE_SIZE = 10
+MAX_PAGES = 100
+DEFAULT_TIMEOUT = (5, 30)
+# Seconds to wait on a 429 response without Retry-After header
+RATE_LIMIT_WAIT = 12
+MAX_RATE_LIMIT_RETRIES = 3
+
+
+def get_search_url() -> str:
+    return os.environ.get("NYT_SEARCH_URL", SEARCH_URL)
+
+
+def get_api_key() -> str:
+    """
+    This function reads the Article Search api key from the NYT_API_KEY environment variable.
+
+    :return: the api key.
+    :raises KeyError: if the variable isn't set.
+    """
+    api_key = os.environ.get("NYT_API_KEY")
+    if not api_key:
+        raise KeyError("NYT_API_KEY is not set")
+    return api_key
+
+
+def build_filter_query(selections: list) -> str:
+    """
+    This function builds the `fq` parameter that filters by section or type of material.
+
+    :param selections: The sections or types selected in the work item. An empty list or ["Any"]
+    doesn't filter
+    :type selections: list
+    :return: the filter query, or None if there is nothing to filter.
+    """
+    if len(selections) == 0 or selections == ["Any"]:
+        return None
+
+    values = " ".join('"%s"' % selection for selection in selections)
+    return "section_name:(%s) OR type_of_material:(%s)" % (values, values)
+
+
+def build_search_params(search: str, month: int, selections: list, api_key: str) -> dict:
+    """
+    This function builds the query parameters of a search: the term, the `get_search_months` date
+    range, newest first and the section or type filter.
+
+    :return: a dictionary with the query parameters, without page.
+    """
+    date_ranges = get_search_months(month)
+    start = datetime.strptime(date_ranges["start"], "%m/%d/%Y")
+    end = datetime.strptime(date_ranges["end"], "%m/%d/%Y")
+
+    params = {
+        "q": search,
+        "begin_date": start.strftime("%Y%m%d"),
+        "end_date": end.strftime("%Y%m%d"),
+        "sort": "newest",
+        "api-key": api_key
+        }
+
+    filter_query = build_filter_query(selections)
+    if filter_query is not None:
+        params["fq"] = filter_query
+
+    return params
+
+
+def format_date(pub_date: str, now: datetime = None) -> str:
+    """
+    This function formats the publication date of an article like the search results page shows it:
+    "5h ago" or "20m ago" in the last day, "Sept. 3" in the current year and "Sept. 3, 2022" before.
+
+    :param pub_date: The publication date of the article, like "2023-04-03T09:00:12+0000"
+    :type pub_date: str
+    :param now: Reference time for the relative dates, defaults to now
+    :type now: datetime
+    :return: the date text.
+    """
+    now = now or datetime.now(timezone.utc)
+    try:
+        published = datetime.strptime(pub_date, "%Y-%m-%dT%H:%M:%S%z")
+    except ValueError:
+        published = datetime.strptime(pub_date[:10], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+    elapsed = (now - published).total_seconds()
+    if 0 <= elapsed < 60 * 60:
+        return "%sm ago" % max(1, int(elapsed // 60))
+    if 0 <= elapsed < 24 * 60 * 60:
+        return "%sh ago" % int(elapsed // (60 * 60))
+
+    return format_result_date(published.date(), now.date())
+
+
+def get_doc_image(doc: dict) -> str:
+    """
+    This function returns the absolute url of the first image of an article, or None.
+    """
+    for media in doc.get("multimedia") or []:
+        url = media.get("url")
+        if media.get("type", "image") == "image" and url:
+            if url.startswith("http"):
+                return url
+            return IMAGES_URL + url.lstrip("/")
+    return None
+
+
+def doc_to_row(doc: dict) -> dict:
+    """
+    This function converts an article of the search response into the fields used by
+    `parsing.build_news_data`.
+    """
+    headline = doc.get("headline") or {}
+    pub_date = doc.get("pub_date")
+    description = doc.get("abstract") or doc.get("snippet") or None
+
+    return {
+        "title": headline.get("main") or None,
+        "date": format_date(pub_date) if pub_date else None,
+        "description": description,
+        "image": get_doc_image(doc)
+        }
+
+
+def get_page(session: requests.Session, params: dict, page: int, timeout: tuple) -> list:
+    """
+    This function requests a page of results, waiting when the endpoint answers with 429.
+
+    :return: the list of articles of the page.
+    """
+    page_params = dict(params, page=page)
+    for _ in range(MAX_RATE_LIMIT_RETRIES):
+        response = session.get(get_search_url(), params=page_params, timeout=timeout)
+        if response.status_code != 429:
+            break
+        wait = int(response.headers.get("Retry-After", RATE_LIMIT_WAIT))
+        logging.error("Search endpoint is rate limited, waiting %s seconds" % wait)
+        time.sleep(wait)
+
+    response.raise_for_status()
+    body = response.json()
+    return body["response"]["docs"] or []
+
+
+def search_news_api(
+        search: str,
+        month: int,
+        selections: list,
+        max_results: int = None,
+        timeout: tuple = DEFAULT_TIMEOUT,
+        is_known_page=None,
+        on_page=None
+        ) -> list:
+    """
+    This function runs the search over plain HTTP against the Article Search endpoint, without a
+    browser, and pages through the results.
+
+    :param search: The term to search
+    :type search: str
+    :param month: Number of months to search, like the "months" work item variable
+    :type month: int
+    :param selections: The sections or types to filter by
+    :type selections: list
+    :param max_results: Stop once this number of results is retrieved. None retrieves every page
+    :type max_results: int
+    :param timeout: (connect, read) timeout in seconds of every request
+    :type timeout: tuple
+    :param is_known_page: Optional function that receives the fields of the results of a page and
+    returns True when all of them were retrieved before, to stop paging
+    :param on_page: Optional function that receives the fields of the results of every page as soon
+    as it is retrieved
+    :return: a list of lists with title, date, description and image, like
+    `scraping.get_news_data`.
+    :raises KeyError: if the api key isn't configured.
+    :raises requests.RequestException: if the endpoint fails.
+    """
+    logging.info("Starting [api_search][search_news_api]")
+    params = build_search_params(search, month, selections, get_api_key())
+
+    rows = []
+    with requests.Session() as session:
+        for page in range(MAX_PAGES):
+            docs = get_page(session, params, page, timeout)
+            page_rows = [doc_to_row(doc) for doc in docs]
+            rows.extend(page_rows)
+            if on_page is not None and len(page_rows) > 0:
+                on_page(page_rows)
+
+            if len(docs) < PAGE_SIZE:
+                break
+            if is_known_page is not None and is_known_page(page_rows):
+                logging.info("Every result of page %s was retrieved before" % (page+1))
+                break
+            if max_results is not None and len(rows) >= max_results:
+                break
+
+    data = build_news_data(rows)
+    if max_results is not None:
+        data = data[:max_results]
+
+    logging.info("Ending [api_search][search_news_api]")
+    return data
+
+
+def get_news_data_from_api(config: RunConfig = None, is_known_page=None, on_page=None) -> list:
+    """
+    This function runs the search with the HTTP backend when the "backend" work item variable is
+    "http".
+
+    :param config: The run configuration, defaults to the loaded one
+    :type config: RunConfig
+    :param is_known_page: Optional function that stops paging when a page has only known results
+    :param on_page: Optional function that receives the fields of the results of every page
+    :return: a list of lists with title, date, description and image, or None when the browser has to
+    be used, either because it was selected or because the HTTP search failed.
+    """
+    config = config or get_config()
+    if config.backend != "http":
+        return None
+
+    try:
+        return search_news_api(
+            config.search,
+            config.months,
+            config.category_or_section,
+            config.max_results,
+            is_known_page=is_known_page,
+            on_page=on_page
+            )
+    except (KeyError, ValueError, requests.RequestException) as e:
+        logging.error("HTTP search failed, falling back to the browser. Reason: %s" % e)
+        return None
@@ -0,0 +1,101 @@
+import os
+import logging
+
+from RPA.Browser.Selenium import Selenium
+from RPA.Robocorp.WorkItems import EmptyQueue, State, Error
+
+from .config import RunConfig, load_config
+from .general import check_path_and_clean
+from .pipeline import run_pipeline
+from .utils import get_work_items, reset_payload, get_output_path, get_screenshot_name
+
+
+def capture_failure(browser: Selenium) -> None:
+    """
+    This function takes a screenshot of the page if the browser is open.
+    """
+    if len(browser.get_browser_ids()) == 0:
+        return
+    try:
+        browser.capture_page_screenshot(filename=get_screenshot_name())
+    except Exception as e:
+        logging.error("Can't take screenshot. Reason: %s" % e)
+
+
+def process_work_item(browser: Selenium, config: RunConfig, index: int) -> dict:
+    """
+    This function runs the pipeline for the current input work item and creates its output work item
+    with the results file and the images zip.
+
+    :param browser: The Selenium instance shared by the batch
+    :type browser: Selenium
+    :param config: The run configuration of the work item
+    :type config: RunConfig
+    :param index: Position of the work item in the batch, used in the output file names
+    :type index: int
+    :return: a dictionary with the search and the pipeline results.
+    """
+    # images of the previous search must not end in this zip
+    check_path_and_clean(os.path.join(get_output_path(), "images"))
+
+    result = run_pipeline(browser, config, suffix="_%s" % index)
+
+    files = [path for path in result["files"] if os.path.exists(path)]
+    get_work_items().create_output_work_item(
+        variables={
+            "search": config.search,
+            "results": result["results"],
+            "images": result["images"]
+            },
+        files=files,
+        save=True
+        )
+
+    return {"search": config.search, "results": result["results"], "images": result["images"]}
+
+
+def run_batch(browser: Selenium) -> list:
+    """
+    This function processes every pending input work item with the same browser session. A failed
+    item is released as failed and the batch continues with the next one.
+
+    :param browser: The Selenium instance shared by the batch
+    :type browser: Selenium
+    :return: a list with a dictionary per work item, with its "status" and results or error.
+    """
+    logging.info("Starting [batch][run_batch]")
+    work_items = get_work_items()
+    summary = []
+    index = 1
+
+    while True:
+        try:
+            config = load_config()
+        except (KeyError, ValueError) as e:
+            # invalid variables, retrying the item won't help
+            logging.error("Work item %s has invalid variables. Reason: %s" % (index, e))
+            work_items.release_input_work_item(State.FAILED, Error.BUSINESS, message=str(e))
+            item_summary = {"status": "FAILED", "error": str(e)}
+        else:
+            try:
+                item_summary = process_work_item(browser, config, index)
+                work_items.release_input_work_item(State.DONE)
+                item_summary["status"] = "DONE"
+            except Exception as e:
+                logging.error("Work item %s failed. Reason: %s" % (index, e))
+                capture_failure(browser)
+                work_items.release_input_work_item(State.FAILED, Error.APPLICATION, message=str(e))
+                item_summary = {"status": "FAILED", "error": str(e)}
+        summary.append(item_summary)
+
+        try:
+            work_items.get_input_work_item()
+        except EmptyQueue:
+            break
+        reset_payload()
+        index = index+1
+
+    failed = len([item for item in summary if item["status"] == "FAILED"])
+    logging.info("Processed %s work items, %s failed" % (len(summary), failed))
+    logging.info("Ending [batch][run_batch]")
+    return summary
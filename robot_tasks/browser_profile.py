@@ -0,0 +1,105 @@
+import os
+import atexit
+import logging
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+from .utils import get_cache_path
+
+# Profiles kept in .cache/browser_profiles. Every run takes the first one not locked by another run,
+# so runs in parallel never share a profile
+MAX_PROFILES = 4
+LOCK_FILE = "robot.lock"
+
+# Profile locked by this process, released by `release_profile`
+_profile = None
+
+
+class BrowserProfile:
+    def __init__(self, path: str):
+        """
+        :param path: Folder of the browser profile, it keeps the cookies and the HTTP disk cache
+        """
+        self.path = path
+        self.lock_path = os.path.join(path, LOCK_FILE)
+        # descriptor of the lock file, open while this process uses the profile
+        self.handler = None
+        # a profile used before already has the consent cookies and the cached assets
+        self.warm = os.path.isdir(path) and any(name != LOCK_FILE for name in os.listdir(path))
+
+    def acquire(self) -> bool:
+        """
+        This function locks the profile for this process with an exclusive lock of the operating
+        system on the lock file. The file stays open while the profile is used, and the lock is
+        released by the system when the process ends, even if it crashes.
+
+        :return: True if the profile was locked, False if another run is using it.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        handler = os.open(self.lock_path, os.O_CREAT | os.O_RDWR)
+        try:
+            if fcntl is not None:
+                fcntl.flock(handler, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(handler, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(handler)
+            return False
+        self.handler = handler
+        return True
+
+    def release(self) -> None:
+        """
+        Unlock the profile. The lock file is kept, removing it would let two runs lock different files
+        """
+        if self.handler is not None:
+            if fcntl is not None:
+                fcntl.flock(self.handler, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(self.handler, msvcrt.LK_UNLCK, 1)
+            os.close(self.handler)
+            self.handler = None
+
+
+def acquire_profile(max_profiles: int = MAX_PROFILES) -> BrowserProfile:
+    """
+    This function locks the first free persistent browser profile. The same profile is returned if
+    this process already holds one.
+
+    :param max_profiles: Number of profiles that can be used at the same time
+    :type max_profiles: int
+    :return: the locked `BrowserProfile`, or None if every profile is used by another run.
+    """
+    global _profile
+    if _profile is not None:
+        return _profile
+
+    root = get_cache_path("browser_profiles")
+    for index in range(max_profiles):
+        profile = BrowserProfile(os.path.join(root, str(index)))
+        if profile.acquire():
+            logging.info(
+                "[browser_profile] Using %s profile %s"
+                % ("warm" if profile.warm else "new", profile.path)
+                )
+            _profile = profile
+            atexit.register(release_profile)
+            return profile
+
+    logging.error("[browser_profile] Every profile is in use, the browser starts with a new one")
+    return None
+
+
+def release_profile() -> None:
+    """
+    Unlock the profile of this process, if any
+    """
+    global _profile
+    if _profile is not None:
+        _profile.release()
+        _profile = None
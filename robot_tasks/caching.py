@@ -0,0 +1,301 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from .metrics import get_metrics
+from .utils import get_cache_path
+
+# Defaults for the image cache
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Seconds an entry is served without revalidation when the server doesn't send max-age
+DEFAULT_MAX_AGE = 24 * 60 * 60
+# The index is saved every SAVE_EVERY stored images, so a crash only loses the last few entries
+SAVE_EVERY = 50
+# Seconds a file of the objects folder can be outside the index before it is removed. Files stored
+# by a crashed run or by another run that hasn't saved its index yet are younger than this
+ORPHAN_GRACE = 24 * 60 * 60
+
+
+def canonical_url(url: str) -> str:
+    """
+    The function normalizes an url so the same resource always produces the same cache key.
+
+    :param url: The url to normalize
+    :type url: str
+    :return: the url with lowercase scheme and host, sorted query parameters and without fragment.
+    """
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    path = parts.path or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+def get_max_age(headers) -> int:
+    """
+    This function reads the freshness lifetime of a response from its Cache-Control header.
+
+    :param headers: The response headers
+    :return: the max-age in seconds, 0 if the response can't be reused without revalidation or
+    `DEFAULT_MAX_AGE` when the header doesn't say anything.
+    """
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return 0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    if match:
+        return int(match.group(1))
+    return DEFAULT_MAX_AGE
+
+
+class ImageCache:
+    def __init__(self, path: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path or get_cache_path("images")
+        self.objects_path = os.path.join(self.path, "objects")
+        self.index_path = os.path.join(self.path, "index.json")
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+        self.unsaved = 0
+        # urls removed by this run, not added back when the index of another run is merged
+        self.removed = set()
+
+        os.makedirs(self.objects_path, exist_ok=True)
+        self.index = self.load_index()
+
+    def load_index(self) -> dict:
+        """
+        This function loads the cache index from disk, dropping entries whose file is missing and
+        files that aren't referenced by any entry for more than `ORPHAN_GRACE` seconds. Temporary
+        files are left alone, they can belong to a download in progress in another run.
+        """
+        index = self.read_index()
+
+        keys = set(entry["key"] for entry in index.values())
+        now = time.time()
+        for filename in os.listdir(self.objects_path):
+            if filename in keys or filename.endswith(".tmp"):
+                continue
+            file_path = os.path.join(self.objects_path, filename)
+            try:
+                if now - os.path.getmtime(file_path) > ORPHAN_GRACE:
+                    os.unlink(file_path)
+            except OSError:
+                # removed by another run in the meantime
+                pass
+
+        return index
+
+    def read_index(self) -> dict:
+        """
+        This function reads the index saved on disk, without the entries whose file is missing.
+        """
+        index = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r") as handler:
+                    index = json.load(handler)
+            except (OSError, ValueError) as e:
+                logging.error("Can't read image cache index. Reason: %s" % e)
+                index = {}
+
+        return {
+            url: entry for url, entry in index.items()
+            if os.path.isfile(self.object_path(entry["key"]))
+            }
+
+    def save_index(self) -> None:
+        """
+        This function writes the cache index to disk atomically. Other runs can share the cache, so
+        the index on disk is merged first: entries stored by them are added, the most recently used
+        version of an entry wins and entries whose file was evicted by any run are dropped.
+        """
+        tmp_path = "%s.%s.tmp" % (self.index_path, os.getpid())
+        with self.lock:
+            merged = self.read_index()
+            for url in self.removed:
+                merged.pop(url, None)
+            for url, entry in self.index.items():
+                saved = merged.get(url)
+                if saved is not None and saved["last_used"] > entry["last_used"]:
+                    continue
+                if saved is not None or os.path.isfile(self.object_path(entry["key"])):
+                    merged[url] = entry
+                else:
+                    merged.pop(url, None)
+            self.index = merged
+            with open(tmp_path, "w") as handler:
+                json.dump(self.index, handler)
+            os.replace(tmp_path, self.index_path)
+            self.unsaved = 0
+
+    def object_path(self, key: str) -> str:
+        return os.path.join(self.objects_path, key)
+
+    def lookup(self, url: str) -> dict:
+        """
+        This function returns the cache entry of an url.
+
+        :param url: The image url
+        :type url: str
+        :return: a dictionary with the entry metadata and a `fresh` flag, or None if the url isn't
+        cached.
+        """
+        url = canonical_url(url)
+        with self.lock:
+            entry = self.index.get(url)
+            if entry is None:
+                return None
+            if not os.path.isfile(self.object_path(entry["key"])):
+                # evicted by another run sharing the cache
+                self.remove(url)
+                return None
+            entry = dict(entry)
+        entry["fresh"] = time.time() < entry["expires"]
+        return entry
+
+    def conditional_headers(self, entry: dict) -> dict:
+        """
+        This function builds the If-None-Match/If-Modified-Since headers to revalidate an entry.
+        """
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def touch(self, url: str, headers=None) -> None:
+        """
+        This function marks an entry as recently used. If the headers of a 304 response are given,
+        its validators and expiration are refreshed too.
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.index.get(canonical_url(url))
+            if entry is None:
+                return
+            entry["last_used"] = now
+            if headers is not None:
+                entry["expires"] = now + get_max_age(headers)
+                entry["etag"] = headers.get("ETag", entry["etag"])
+                entry["last_modified"] = headers.get("Last-Modified", entry["last_modified"])
+
+    def store(self, url: str, chunks, headers) -> None:
+        """
+        This function saves the content of a response in the cache.
+
+        :param url: The image url
+        :type url: str
+        :param chunks: Iterable of bytes with the image content
+        :param headers: The response headers, used for the validators and expiration
+        """
+        url = canonical_url(url)
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        file_path = self.object_path(key)
+        tmp_path = "%s.%s.tmp" % (file_path, threading.get_ident())
+
+        size = 0
+        try:
+            with open(tmp_path, "wb") as handler:
+                for chunk in chunks:
+                    handler.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, file_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        now = time.time()
+        with self.lock:
+            self.removed.discard(url)
+            self.index[url] = {
+                "key": key,
+                "size": size,
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "expires": now + get_max_age(headers),
+                "last_used": now
+                }
+            self.unsaved += 1
+            save = self.unsaved >= SAVE_EVERY
+        self.evict(keep=url)
+        if save:
+            self.save_index()
+
+    def open(self, url: str):
+        """
+        This function opens the cached content of an url for reading. The file is opened holding the
+        lock, so a concurrent eviction can't remove it in between.
+
+        :param url: The image url
+        :type url: str
+        :return: a binary file object, or None if the url isn't cached or its file was evicted by
+        another run sharing the cache.
+        """
+        url = canonical_url(url)
+        with self.lock:
+            entry = self.index.get(url)
+            if entry is None:
+                return None
+            try:
+                return open(self.object_path(entry["key"]), "rb")
+            except FileNotFoundError:
+                self.remove(url)
+                return None
+
+    def remove(self, url: str) -> None:
+        """
+        This function drops the entry of a canonical url from the index. The caller holds the lock.
+        """
+        del self.index[url]
+        self.removed.add(url)
+
+    def evict(self, keep: str = None) -> None:
+        """
+        This function removes the least recently used entries until the cache fits in `max_bytes`.
+
+        :param keep: Canonical url of an entry that must not be evicted, like the one just stored
+        :type keep: str
+        """
+        with self.lock:
+            total = sum(entry["size"] for entry in self.index.values())
+            if total <= self.max_bytes:
+                return
+
+            by_last_use = sorted(self.index.items(), key=lambda item: item[1]["last_used"])
+            for url, entry in by_last_use:
+                if total <= self.max_bytes:
+                    break
+                if url == keep:
+                    continue
+                try:
+                    os.unlink(self.object_path(entry["key"]))
+                except OSError as e:
+                    logging.error("Can't evict %s from cache. Reason: %s" % (url, e))
+                total -= entry["size"]
+                self.remove(url)
+
+    def count(self, result: str) -> None:
+        """
+        This function counts a cache result: "hits", "revalidated" or "misses".
+        """
+        with self.lock:
+            self.stats[result] += 1
+
+    def close(self) -> None:
+        """
+        Save the index and log the cache usage
+        """
+        self.save_index()
+        for result, value in self.stats.items():
+            get_metrics().count("cache_%s" % result, value)
+        logging.info(
+            "Image cache: %s hits, %s revalidated, %s misses"
+            % (self.stats["hits"], self.stats["revalidated"], self.stats["misses"])
+            )
@@ -1,5 +1,22 @@
 import re, logging
-from .utils import clean_image_url, get_variable
+from .config import RunConfig, get_config
+from .images import ImageIdentity
+
+# Money formats, compiled once for the whole run:
+# $11.1 | $111,111.11 | $5 million | $12 USD | 11 dollars | 11 USD
+MONEY_PATTERN = re.compile(
+    r'\$(?P<amount>[\d,]+(?:\.\d{1,2})?)'
+    r'(?:\s+(?P<scale>thousand|million|billion|trillion)\b)?'
+    r'(?: USD| dollars)?'
+    r'|\b(?P<plain_amount>\d+)\s+(?:dollars|USD)\b'
+    )
+
+SCALES = {
+    "thousand": 1_000,
+    "million": 1_000_000,
+    "billion": 1_000_000_000,
+    "trillion": 1_000_000_000_000
+    }
 
 def find_money_in_text(text: str) -> bool:
     """
@@ -11,17 +28,54 @@ def find_money_in_text(text: str) -> bool:
     :return: The function `find_money_in_text` returns a boolean value indicating whether the input
     `text` contains a valid money format or not.
     """
-    pattern = re.compile('|'.join([
-        r'\$[\d,]+(\.\d{1,2})?( USD| dollars)?',
-        r'\$\d+',
-        r'(\b\d+\s+dollars\b)|(\b\d+\s+USD\b)'
-    ]))
-
-    result = pattern.search(text)
+    result = MONEY_PATTERN.search(text)
     found = result is not None
 
     return found
 
+def get_money_amounts(text: str) -> list:
+    """
+    The function finds every money value in a text and converts it into a number.
+
+    :param text: The input text that we want to search for money values
+    :type text: str
+    :return: a list of floats with the amounts in the order they appear, "$5 million" is 5000000.0.
+    Matches without digits, like "$,", aren't included.
+    """
+    amounts = []
+    for match in MONEY_PATTERN.finditer(text):
+        if match.group("plain_amount") is not None:
+            amounts.append(float(match.group("plain_amount")))
+            continue
+
+        digits = match.group("amount").replace(",", "")
+        if digits.strip(".") == "":
+            continue
+        amount = float(digits)
+        if match.group("scale") is not None:
+            amount = amount * SCALES[match.group("scale")]
+        amounts.append(amount)
+
+    return amounts
+
+def analyze_money(texts: list) -> list:
+    """
+    The function analyzes a batch of texts in a single pass with the precompiled money pattern.
+
+    :param texts: The texts to analyze
+    :type texts: list
+    :return: a list with a dictionary per text, with "contains_money" (bool) and "amounts" (list of
+    floats) keys.
+    """
+    results = []
+    for text in texts:
+        amounts = get_money_amounts(text)
+        # a match without digits still counts as money, like in `find_money_in_text`
+        contains_money = len(amounts) > 0 or MONEY_PATTERN.search(text) is not None
+        results.append({"contains_money": contains_money, "amounts": amounts})
+
+    return results
+
 def count_search_phrases(text: str, search: str) -> int:
     # Does not include overlapping matches
     # Case insensitive
@@ -29,55 +83,72 @@ def count_search_phrases(text: str, search: str) -> int:
     return count
 
 
-def get_calculated_data(data: list) -> list:
+def calculate_news(data: list, search: str, unique_images: ImageIdentity) -> list:
     """
-    The function takes a list of data and adds extra information to each item in the list, including
-    whether the text contains money and the count of search phrases.
+    This function adds the money and search phrase columns to a batch of news and collects the images
+    to download.
 
-    :param data: The input parameter is a list of lists, where each inner list contains information
-    about a particular item. The inner lists have four elements: title, date, description, and image
+    :param data: A list of lists with title, date, description and image
     :type data: list
-    :return: The function `get_calculated_data` is returning a list of lists. Each inner list contains
-    the original data passed in as an argument (title, date, description, and image), as well as two
-    additional pieces of information: whether the text (title and description concatenated) contains
-    money (as determined by the `find_money_in_text` function) and the count of search phrases in the
-    text (as determined by the `count_search_phrases` function)
+    :param search: The search term
+    :type search: str
+    :param unique_images: `ImageIdentity` of the run, shared between batches so an image is
+    downloaded once
+    :type unique_images: ImageIdentity
+    :return: a list with the rows of the results file and the [name, url] of the new images.
     """
-    logging.info("Starting [calculations][get_calculated_data]")
+    data_with_extra_info = []
 
-    search = get_variable("search")
-    # data information contains
-    # 0 title | 1 date | 2 description | 3 image
+    # concatenate title and description
+    texts = [new[0]+new[2] for new in data]
+    money = analyze_money(texts)
+    # renditions of the same image share a name and only one of them is downloaded
+    image_names, images_data = unique_images.add_batch([new[3] for new in data])
 
-    data_with_extra_info = []
-    # for control
-    unique_images = []
-    # to actually store images information (url and name)
-    images_data = []
-    for new in data:
-        # concatenate title and description
-        text = new[0]+new[2]
-        contains_money = find_money_in_text(text)
+    for new, text, new_money, image_name in zip(data, texts, money, image_names):
         search_phrases = count_search_phrases(text, search)
-        image_name = clean_image_url(new[3])
         # data_with_extra_info information contains
         # 0 title | 1 date | 2 description | 3 image name
-        # 4 contains money | 5 count search phrases
+        # 4 contains money | 5 count search phrases | 6 money amounts
         data_with_extra_info.append([
             new[0],
             new[1],
             new[2],
             image_name,
-            contains_money,
-            search_phrases
+            new_money["contains_money"],
+            search_phrases,
+            new_money["amounts"]
             ])
 
-        if image_name not in unique_images and image_name != "N/A":
-            unique_images.append(image_name)
-            images_data.append([image_name, new[3]])
-
-    logging.info("Ending [calculations][get_calculated_data]")
     return [data_with_extra_info, images_data]
 
 
+def get_calculated_data(data: list, config: RunConfig = None) -> list:
+    """
+    The function takes a list of data and adds extra information to each item in the list, including
+    whether the text contains money and the count of search phrases.
 
+    :param data: The input parameter is a list of lists, where each inner list contains information
+    about a particular item. The inner lists have four elements: title, date, description, and image
+    :type data: list
+    :param config: The run configuration with the search term, defaults to the loaded one
+    :type config: RunConfig
+    :return: The function `get_calculated_data` is returning a list of lists. Each inner list contains
+    the original data passed in as an argument (title, date, description, and image), as well as two
+    additional pieces of information: whether the text (title and description concatenated) contains
+    money and the amounts found (as determined by the `analyze_money` function) and the count of
+    search phrases in the text (as determined by the `count_search_phrases` function)
+    """
+    logging.info("Starting [calculations][get_calculated_data]")
+
+    search = (config or get_config()).search
+    # data information contains
+    # 0 title | 1 date | 2 description | 3 image
+
+    # for control
+    unique_images = ImageIdentity()
+    data_with_extra_info, images_data = calculate_news(data, search, unique_images)
+    unique_images.log_summary()
+
+    logging.info("Ending [calculations][get_calculated_data]")
+    return [data_with_extra_info, images_data]
@@ -0,0 +1,134 @@
+import os
+import json
+import gzip
+import time
+import shutil
+import hashlib
+import logging
+from .config import RunConfig
+from .filtering import get_search_months
+from .utils import get_cache_path
+
+# Seconds a checkpoint can be resumed. Older ones are removed, the results would be outdated
+CHECKPOINT_MAX_AGE = 12 * 60 * 60
+# Empty file whose modification time is the start of the first run of a checkpoint
+STARTED_FILE = "started"
+# Variables that change what is scraped or calculated. Other variables, like the download workers or
+# the thumbnails, can change between a failed run and its retry
+CHECKPOINT_FIELDS = [
+    "search", "category_or_section", "months", "max_results", "search_mode", "image_width",
+    "backend", "incremental", "emit"
+    ]
+
+
+def get_checkpoint_key(config: RunConfig, suffix: str = "") -> str:
+    """
+    This function builds the key of the checkpoints of a run. Runs with the same `CHECKPOINT_FIELDS`,
+    the same output suffix and the same date range share it.
+
+    :param config: The run configuration
+    :type config: RunConfig
+    :param suffix: The output suffix of the run
+    :type suffix: str
+    :return: a hex hash.
+    """
+    content = json.dumps(
+        [
+            {field: getattr(config, field) for field in CHECKPOINT_FIELDS},
+            suffix,
+            get_search_months(config.months)
+            ],
+        sort_keys=True
+        )
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class Checkpoint:
+    def __init__(
+        self,
+        config: RunConfig,
+        suffix: str = "",
+        path: str = None,
+        max_age: int = CHECKPOINT_MAX_AGE
+    ):
+        """
+        :param config: The run configuration, the checkpoints of another configuration aren't used
+        :param suffix: The output suffix of the run
+        :param path: Folder of the checkpoints, defaults to ".cache/checkpoints"
+        :param max_age: Seconds a checkpoint can be resumed
+        """
+        self.root = path or get_cache_path("checkpoints")
+        self.max_age = max_age
+        self.remove_expired()
+
+        self.path = os.path.join(self.root, get_checkpoint_key(config, suffix))
+        # images are saved here instead of output/images, so a failed download can be resumed
+        self.images_path = os.path.join(self.path, "images")
+        # zip of the images when they are streamed into it, reopened to add the missing ones
+        self.archive_path = os.path.join(self.path, "images.zip")
+        os.makedirs(self.images_path, exist_ok=True)
+        started_path = os.path.join(self.path, STARTED_FILE)
+        if not os.path.exists(started_path):
+            open(started_path, "w").close()
+
+    def remove_expired(self) -> None:
+        """
+        This function removes the checkpoints of runs started more than `max_age` seconds ago.
+        """
+        if not os.path.isdir(self.root):
+            return
+        now = time.time()
+        for name in os.listdir(self.root):
+            folder = os.path.join(self.root, name)
+            started_path = os.path.join(folder, STARTED_FILE)
+            if not os.path.exists(started_path):
+                started_path = folder
+            if now - os.path.getmtime(started_path) > self.max_age:
+                shutil.rmtree(folder, ignore_errors=True)
+
+    def get_stage_path(self, stage: str) -> str:
+        return os.path.join(self.path, "%s.json.gz" % stage)
+
+    def has(self, stage: str) -> bool:
+        return os.path.exists(self.get_stage_path(stage))
+
+    def load(self, stage: str):
+        """
+        This function reads the output of a stage saved by a previous run.
+
+        :param stage: The stage name, like "scraped" or "calculated"
+        :type stage: str
+        :return: the saved output, or None if the stage wasn't completed.
+        """
+        try:
+            with gzip.open(self.get_stage_path(stage), "rt", encoding="utf-8") as handler:
+                value = json.load(handler)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.error("Can't read the %s checkpoint. Reason: %s" % (stage, e))
+            return None
+
+        logging.info("[checkpoint] Resuming from the %s stage" % stage)
+        return value
+
+    def save(self, stage: str, value) -> None:
+        """
+        This function saves the output of a completed stage as gzip compressed json. The file is
+        replaced atomically, so a failure while saving doesn't leave a broken checkpoint.
+
+        :param stage: The stage name
+        :type stage: str
+        :param value: The output of the stage, any value json can encode
+        """
+        final_path = self.get_stage_path(stage)
+        tmp_path = final_path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as handler:
+            json.dump(value, handler, separators=(",", ":"))
+        os.replace(tmp_path, final_path)
+
+    def clear(self) -> None:
+        """
+        Remove the checkpoints and the images of the run once it ends successfully
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,176 @@
+import os
+import logging
+from dataclasses import dataclass
+
+from .downloading import DEFAULT_WORKERS
+from .utils import get_payload
+
+BACKENDS = ["browser", "http"]
+OUTPUT_FORMATS = ["xlsx", "csv", "parquet"]
+BROWSER_PROFILES = ["default", "scrape"]
+# incremental runs emit only the articles not seen before or every indexed article
+EMIT_MODES = ["new", "all"]
+THUMBNAIL_FORMATS = ["jpeg", "webp"]
+# the search is opened with a single url or by clicking through the search form and filters
+SEARCH_MODES = ["url", "click"]
+
+# Loaded once by `load_config` and shared by the whole run
+_config = None
+
+
+def to_bool(value) -> bool:
+    """
+    The function converts a work item value like true, "true", "yes" or "1" into a boolean.
+    """
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ["true", "yes", "1"]
+
+
+def to_optional_int(value, name: str) -> int:
+    """
+    The function converts a work item value into an int, empty values are None.
+
+    :raises ValueError: if the value isn't a positive number.
+    """
+    if value is None or str(value).strip() == "":
+        return None
+    number = int(value)
+    if number <= 0:
+        raise ValueError("%s must be greater than 0" % name)
+    return number
+
+
+@dataclass
+class RunConfig:
+    search: str
+    category_or_section: list
+    months: int
+    backend: str = "browser"
+    max_results: int = None
+    stream_images: bool = False
+    use_cache: bool = True
+    download_workers: int = DEFAULT_WORKERS
+    output_format: str = "xlsx"
+    stream_excel: bool = True
+    browser_profile: str = "default"
+    incremental: bool = False
+    emit: str = "new"
+    search_mode: str = "url"
+    streaming: bool = False
+    resume: bool = True
+    image_width: int = None
+    thumbnail_size: int = None
+    thumbnail_format: str = "jpeg"
+    thumbnail_quality: int = 80
+    persistent_profile: bool = False
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "RunConfig":
+        """
+        This function builds and validates the run configuration from a work item payload.
+
+        :param payload: The variables of the input work item
+        :type payload: dict
+        :return: the run configuration.
+        :raises KeyError: if search, category_or_section or months are missing.
+        :raises ValueError: if a variable has an invalid value.
+        """
+        search = str(payload["search"]).strip()
+        if search == "":
+            raise ValueError("search can't be empty")
+
+        category_or_section = payload["category_or_section"]
+        if isinstance(category_or_section, str):
+            category_or_section = [category_or_section] if category_or_section else []
+
+        months = int(payload["months"])
+        if months < 0:
+            raise ValueError("months can't be lower than 0")
+
+        backend = str(payload.get("backend", "browser")).strip().lower()
+        if backend not in BACKENDS:
+            raise ValueError("backend must be one of %s" % ", ".join(BACKENDS))
+
+        output_format = str(payload.get("output_format", "xlsx")).strip().lower()
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError("output_format must be one of %s" % ", ".join(OUTPUT_FORMATS))
+
+        # the work item wins over the BROWSER_PROFILE environment variable
+        browser_profile = payload.get("browser_profile", os.environ.get("BROWSER_PROFILE", "default"))
+        browser_profile = str(browser_profile).strip().lower()
+        if browser_profile not in BROWSER_PROFILES:
+            raise ValueError("browser_profile must be one of %s" % ", ".join(BROWSER_PROFILES))
+
+        emit = str(payload.get("emit", "new")).strip().lower()
+        if emit not in EMIT_MODES:
+            raise ValueError("emit must be one of %s" % ", ".join(EMIT_MODES))
+
+        search_mode = str(payload.get("search_mode", "url")).strip().lower()
+        if search_mode not in SEARCH_MODES:
+            raise ValueError("search_mode must be one of %s" % ", ".join(SEARCH_MODES))
+
+        thumbnail_format = str(payload.get("thumbnail_format", "jpeg")).strip().lower()
+        if thumbnail_format not in THUMBNAIL_FORMATS:
+            raise ValueError("thumbnail_format must be one of %s" % ", ".join(THUMBNAIL_FORMATS))
+
+        thumbnail_quality = to_optional_int(payload.get("thumbnail_quality"), "thumbnail_quality")
+        if thumbnail_quality is None:
+            thumbnail_quality = 80
+        if thumbnail_quality > 95:
+            raise ValueError("thumbnail_quality can't be greater than 95")
+
+        download_workers = to_optional_int(payload.get("download_workers"), "download_workers")
+
+        return cls(
+            search=search,
+            category_or_section=list(category_or_section),
+            months=months,
+            backend=backend,
+            max_results=to_optional_int(payload.get("max_results"), "max_results"),
+            stream_images=to_bool(payload.get("stream_images", False)),
+            use_cache=to_bool(payload.get("use_cache", True)),
+            download_workers=download_workers or DEFAULT_WORKERS,
+            output_format=output_format,
+            stream_excel=to_bool(payload.get("stream_excel", True)),
+            browser_profile=browser_profile,
+            incremental=to_bool(payload.get("incremental", False)),
+            emit=emit,
+            search_mode=search_mode,
+            streaming=to_bool(payload.get("streaming", False)),
+            resume=to_bool(payload.get("resume", True)),
+            image_width=to_optional_int(payload.get("image_width"), "image_width"),
+            thumbnail_size=to_optional_int(payload.get("thumbnail_size"), "thumbnail_size"),
+            thumbnail_format=thumbnail_format,
+            thumbnail_quality=thumbnail_quality,
+            persistent_profile=to_bool(
+                payload.get("persistent_profile", os.environ.get("PERSISTENT_PROFILE", False))
+                )
+            )
+
+
+def load_config() -> RunConfig:
+    """
+    This function reads the input work item once, validates it and keeps the run configuration for
+    the rest of the run.
+
+    :return: the run configuration.
+    """
+    global _config
+    try:
+        _config = RunConfig.from_payload(get_payload())
+    except (KeyError, ValueError) as e:
+        logging.error("This robot needs 3 variables to run: search, category_or_section and months")
+        logging.error("Set them from the control room")
+        logging.error(e)
+        raise
+    return _config
+
+
+def get_config() -> RunConfig:
+    """
+    This function returns the run configuration, loading it the first time.
+    """
+    if _config is None:
+        return load_config()
+    return _config
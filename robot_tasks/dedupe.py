@@ -0,0 +1,70 @@
+import hashlib
+import logging
+
+
+def normalize_key_text(text: str) -> str:
+    """
+    The function lowercases a text and collapses its whitespace, so small rendering differences don't
+    change the key.
+    """
+    return " ".join(str(text).lower().split())
+
+
+def get_article_key(title: str, date: str) -> str:
+    """
+    This function builds the stable key of an article from its title and date.
+
+    :param title: The article title
+    :type title: str
+    :param date: The article date as shown in the results
+    :type date: str
+    :return: a hex sha1 hash of the normalized title and date.
+    """
+    text = "%s|%s" % (normalize_key_text(title), normalize_key_text(date))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class Deduplicator:
+    def __init__(self, name: str):
+        self.name = name
+        self.seen = set()
+        self.duplicates = 0
+
+    def is_new(self, key) -> bool:
+        """
+        This function checks if a key wasn't seen before and remembers it. Lookups are constant time.
+
+        :param key: Any hashable key
+        :return: True the first time a key is seen, False for duplicates.
+        """
+        if key in self.seen:
+            self.duplicates += 1
+            return False
+        self.seen.add(key)
+        return True
+
+    def log_summary(self) -> None:
+        """
+        Log the number of unique items and duplicates found
+        """
+        logging.info(
+            "[dedupe][%s] %s unique, %s duplicates removed"
+            % (self.name, len(self.seen), self.duplicates)
+            )
+
+
+def dedupe(items: list, key, name: str) -> list:
+    """
+    This function removes duplicated items keeping the first seen order.
+
+    :param items: The items to dedupe
+    :type items: list
+    :param key: Function that returns the key of an item
+    :param name: Name used in the log summary
+    :type name: str
+    :return: a list with the first item of every key, in the original order.
+    """
+    deduplicator = Deduplicator(name)
+    unique = [item for item in items if deduplicator.is_new(key(item))]
+    deduplicator.log_summary()
+    return unique
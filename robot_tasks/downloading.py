@@ -1,14 +1,620 @@
 import requests
 import os
+import json
+import time
+import random
 import shutil
+import hashlib
 import logging
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 
+from requests.adapters import HTTPAdapter
+
+from .caching import ImageCache
+from .metrics import get_metrics
 from .utils import get_output_path
 
+# Concurrency defaults for the image downloader
+DEFAULT_WORKERS = 8
+DEFAULT_CONNECTIONS_PER_HOST = 4
+# (connect, read) timeout in seconds for every request
+DEFAULT_TIMEOUT = (5, 30)
+CHUNK_SIZE = 64 * 1024
+# Bytes of a single image kept in memory before spilling to a temporary file
+SPOOL_SIZE = 1024 * 1024
+# Written next to the images, it maps the names of the images that had the same content as another
+# one to the name of the image saved
+DUPLICATES_FILE = "duplicates.json"
+# Added to the name of an image while it is written, it is renamed once complete
+PART_SUFFIX = ".part"
+# Attempts of every image. Only the images that failed with a retryable error are tried again,
+# waiting BACKOFF_BASE * 2 ** attempt seconds (with jitter, up to BACKOFF_MAX) between attempts
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 10
+# Responses worth trying again, any other error status is permanent (404, 403, 410, ...)
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# Consecutive failures of a host that open its circuit. While it is open the images of the host
+# fail without a request, after CIRCUIT_COOLDOWN seconds one request is let through to test it
+CIRCUIT_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    This function classifies a download error. Timeouts, connection errors, broken transfers and
+    the statuses in `RETRYABLE_STATUS` can succeed in a later attempt. Other error statuses, invalid
+    urls and local errors writing the image can't.
+
+    :param error: The exception raised while downloading an image
+    :type error: Exception
+    :return: True if the image can be tried again.
+    """
+    if isinstance(error, requests.HTTPError):
+        response = error.response
+        return response is not None and response.status_code in RETRYABLE_STATUS
+    if isinstance(error, (requests.exceptions.InvalidURL, requests.exceptions.MissingSchema,
+                          requests.exceptions.InvalidSchema)):
+        return False
+    if isinstance(error, (requests.ConnectionError, requests.Timeout,
+                          requests.exceptions.ChunkedEncodingError,
+                          requests.exceptions.ContentDecodingError)):
+        return True
+    return isinstance(error, CircuitOpenError)
+
+
+def is_host_failure(error: Exception) -> bool:
+    """
+    This function checks if a download error means the host is down or failing: connection errors,
+    timeouts, broken transfers and 5xx responses. Other responses, like a 404, show the host is up,
+    and a full disk or an invalid url say nothing about it.
+    """
+    if isinstance(error, requests.HTTPError):
+        response = error.response
+        return response is None or response.status_code >= 500
+    return isinstance(error, requests.RequestException) and is_retryable(error)
+
+
+def get_backoff(attempt: int, error: Exception = None) -> float:
+    """
+    This function calculates the seconds to wait before the next attempt of an image: an
+    exponential backoff with full jitter, so the workers don't retry at the same time. A numeric
+    Retry-After header of the failed response is respected.
+
+    :param attempt: Number of attempts already made, from 1
+    :type attempt: int
+    :param error: The error of the last attempt
+    :return: the seconds to wait.
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(int(retry_after), BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = CIRCUIT_THRESHOLD, cooldown: float = CIRCUIT_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        # host -> consecutive failures
+        self.failures = {}
+        # host -> time its circuit was opened
+        self.opened_at = {}
+
+    def allow(self, host: str) -> bool:
+        """
+        This function checks if a request to the host can be made. Once the cooldown of an open
+        circuit ends a single request is let through, its result closes or opens the circuit again.
+        """
+        with self.lock:
+            opened_at = self.opened_at.get(host)
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at < self.cooldown:
+                return False
+            # half open, the next requests wait for the result of this one
+            self.opened_at[host] = time.monotonic()
+            return True
+
+    def record_success(self, host: str) -> None:
+        with self.lock:
+            self.failures.pop(host, None)
+            if self.opened_at.pop(host, None) is not None:
+                logging.info("[downloading] Circuit of %s closed" % host)
+
+    def record_failure(self, host: str) -> None:
+        with self.lock:
+            self.failures[host] = self.failures.get(host, 0) + 1
+            if self.failures[host] >= self.threshold:
+                if host not in self.opened_at:
+                    logging.error(
+                        "[downloading] %s failed %s times in a row, circuit opened for %s seconds"
+                        % (host, self.failures[host], self.cooldown)
+                        )
+                    get_metrics().count("circuits_opened")
+                self.opened_at[host] = time.monotonic()
+
+
+def hash_chunks(chunks, digest):
+    """
+    This function yields the chunks unchanged while adding them to a hashlib digest.
+    """
+    for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
+
+class ContentIndex:
+    def __init__(self):
+        # content hash -> name of the image saved with it
+        self.hashes = {}
+        # name of an image not saved -> name of the image with the same content
+        self.aliases = {}
+
+    def add(self, filename: str, content_hash: str) -> str:
+        """
+        This function registers the content of a downloaded image. It isn't thread safe, the writers
+        call it holding their lock.
+
+        :return: the name of the image saved before with the same content, or None if it is new.
+        """
+        existing = self.hashes.get(content_hash)
+        if existing is not None and existing != filename:
+            self.aliases[filename] = existing
+            get_metrics().count("image_duplicates")
+            return existing
+        self.hashes[content_hash] = filename
+        return None
+
+    def to_json(self) -> str:
+        return json.dumps(self.aliases, indent=2, sort_keys=True)
+
+
+def create_session(connections_per_host: int = DEFAULT_CONNECTIONS_PER_HOST) -> requests.Session:
+    """
+    The function creates a requests session with a connection pool shared by all the download workers.
+
+    :param connections_per_host: Maximum number of simultaneous connections opened against the same
+    host. Workers that exceed it wait for a free connection instead of opening a new one
+    :type connections_per_host: int
+    :return: a `requests.Session` with pooled (keep-alive) adapters mounted for http and https.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        # number of hosts whose pools are kept alive
+        pool_connections=10,
+        pool_maxsize=connections_per_host,
+        pool_block=True
+        )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class FolderWriter:
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.lock = threading.Lock()
+        self.contents = ContentIndex()
+        # duplicates found by a previous run in the same folder
+        self.duplicates_path = os.path.join(folder, DUPLICATES_FILE)
+        if os.path.isfile(self.duplicates_path):
+            with open(self.duplicates_path) as handler:
+                self.contents.aliases.update(json.load(handler))
+            os.unlink(self.duplicates_path)
+        self.load_contents()
+
+    def load_contents(self) -> None:
+        """
+        This function hashes the images saved by a previous run in the folder, so a new image with
+        the same content is still stored once. Partial files of a run killed while writing are
+        removed.
+        """
+        if not os.path.isdir(self.folder):
+            return
+        for name in sorted(os.listdir(self.folder)):
+            path = os.path.join(self.folder, name)
+            if not os.path.isfile(path):
+                continue
+            if name.endswith(PART_SUFFIX):
+                os.unlink(path)
+                continue
+            digest = hashlib.sha256()
+            with open(path, "rb") as handler:
+                for chunk in iter(lambda: handler.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            self.contents.add(name, digest.hexdigest())
+
+    def contains(self, filename: str) -> bool:
+        """
+        This function checks if an image was already saved in the folder, or another image with the
+        same content.
+        """
+        return filename in self.contents.aliases or os.path.isfile(os.path.join(self.folder, filename))
+
+    def write(self, filename: str, chunks) -> None:
+        """
+        This function writes the chunks of an image to a partial file in the folder, renamed to the
+        image name after the last chunk. If the download fails in the middle, the partial file is
+        removed and the exception is raised again, the folder only has complete images.
+
+        An image with the same content as one already saved is removed after the download, byte
+        identical images are stored once.
+
+        :param filename: Name of the image file
+        :type filename: str
+        :param chunks: Iterable of bytes with the image content
+        """
+        file_path = os.path.join(self.folder, filename)
+        part_path = file_path + PART_SUFFIX
+        digest = hashlib.sha256()
+        try:
+            with open(part_path, 'wb') as handler:
+                for chunk in hash_chunks(chunks, digest):
+                    handler.write(chunk)
+        except Exception:
+            # don't leave half written files behind
+            if os.path.exists(part_path):
+                os.unlink(part_path)
+            raise
+
+        with self.lock:
+            if self.contents.add(filename, digest.hexdigest()) is not None:
+                os.unlink(part_path)
+            else:
+                os.replace(part_path, file_path)
+
+    def count(self) -> int:
+        return count_items_in_directory(self.folder) + len(self.contents.aliases)
+
+    def close(self) -> None:
+        """
+        Write the names of the duplicated images, if any
+        """
+        if len(self.contents.aliases) > 0:
+            with open(self.duplicates_path, "w") as handler:
+                handler.write(self.contents.to_json())
+
+
+class ZipWriter:
+    def __init__(self, zip_path: str, spool_size: int = SPOOL_SIZE, append: bool = False):
+        """
+        :param zip_path: Path of the zip file
+        :param spool_size: Bytes of a single image kept in memory before spilling to a temporary file
+        :param append: If True and the zip exists, the images are added to it and the images already
+        in it aren't downloaded again, like the images already in the folder of a `FolderWriter`
+        """
+        self.spool_size = spool_size
+        self.lock = threading.Lock()
+        self.names = set()
+        self.contents = ContentIndex()
+        self.archive = None
+        if append and os.path.isfile(zip_path):
+            self.archive = self.reopen(zip_path)
+        if self.archive is None:
+            # images are already compressed, deflating them again only costs CPU
+            self.archive = zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_STORED)
+
+    def reopen(self, zip_path: str) -> zipfile.ZipFile:
+        """
+        This function opens an existing zip to add images to it, and rebuilds the names and the
+        content index of the images already in it. The duplicates file is removed from the zip, it is
+        written again with every duplicate when the writer is closed.
+
+        :return: the zip opened in append mode, or None if it can't be read. A run killed while
+        writing leaves a zip without its central directory.
+        """
+        try:
+            with zipfile.ZipFile(zip_path) as archive:
+                names = archive.namelist()
+                if DUPLICATES_FILE in names:
+                    self.contents.aliases.update(json.loads(archive.read(DUPLICATES_FILE)))
+            if DUPLICATES_FILE in names:
+                remove_zip_entry(zip_path, DUPLICATES_FILE)
+            archive = zipfile.ZipFile(zip_path, 'a', compression=zipfile.ZIP_STORED)
+        except (zipfile.BadZipFile, ValueError) as e:
+            logging.error(
+                "[downloading] Can't reopen %s, writing a new one. Reason: %s" % (zip_path, e))
+            self.contents = ContentIndex()
+            return None
+
+        for name in archive.namelist():
+            digest = hashlib.sha256()
+            with archive.open(name) as entry:
+                for chunk in iter(lambda: entry.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            self.contents.add(name, digest.hexdigest())
+            self.names.add(name)
+        logging.info("[downloading] %s images already in %s" % (len(self.names), zip_path))
+        return archive
+
+    def contains(self, filename: str) -> bool:
+        """
+        This function checks if an image was already written to the archive, or another image with
+        the same content.
+        """
+        return filename in self.names or filename in self.contents.aliases
+
+    def write(self, filename: str, chunks) -> None:
+        """
+        This function writes the chunks of an image as a new entry of the zip file.
+
+        A zip archive accepts only one open entry at a time, so every worker buffers its response in a
+        spooled temporary file (kept in memory up to `spool_size` bytes, on disk after that) and then
+        copies it into the archive holding the lock. A failed download never leaves a broken entry.
+        An image with the same content as one already written isn't added again.
+
+        :param filename: Name of the entry inside the zip
+        :type filename: str
+        :param chunks: Iterable of bytes with the image content
+        """
+        digest = hashlib.sha256()
+        with tempfile.SpooledTemporaryFile(max_size=self.spool_size) as buffer:
+            for chunk in hash_chunks(chunks, digest):
+                buffer.write(chunk)
+            buffer.seek(0)
+
+            with self.lock:
+                if self.contents.add(filename, digest.hexdigest()) is not None:
+                    return
+                with self.archive.open(filename, 'w') as entry:
+                    shutil.copyfileobj(buffer, entry, CHUNK_SIZE)
+                self.names.add(filename)
+
+    def count(self) -> int:
+        return len(self.names) + len(self.contents.aliases)
+
+    def close(self) -> None:
+        """
+        Write the names of the duplicated images, if any, the zip central directory and close the file
+        """
+        if len(self.contents.aliases) > 0:
+            self.archive.writestr(DUPLICATES_FILE, self.contents.to_json())
+        self.archive.close()
+
+
+class ImageDownloader:
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        connections_per_host: int = DEFAULT_CONNECTIONS_PER_HOST,
+        timeout: tuple = DEFAULT_TIMEOUT,
+        cache: ImageCache = None,
+        max_attempts: int = MAX_ATTEMPTS,
+        breaker: CircuitBreaker = None
+    ):
+        self.workers = max(1, int(workers))
+        self.timeout = timeout
+        self.session = create_session(connections_per_host)
+        self.cache = cache
+        self.max_attempts = max(1, int(max_attempts))
+        self.breaker = breaker or CircuitBreaker()
+        self.lock = threading.Lock()
+        # image name -> {"url", "error", "attempts", "retryable"} of the images not saved
+        self.failures = {}
+
+    def fetch(self, row: list, writer) -> bool:
+        """
+        This function downloads a single image and streams it to the writer. Retryable errors are
+        tried again after a backoff, up to `max_attempts` times, permanent errors aren't.
+
+        :param row: A list with the image name in the first position and the image url in the second
+        :type row: list
+        :param writer: `FolderWriter` or `ZipWriter` where the image will be saved
+        :return: True if the image was saved, False otherwise.
+        """
+        filename = row[0]
+        image_url = row[1]
+        if image_url == "N/A":
+            return False
+
+        # already saved in a previous run
+        if writer.contains(filename):
+            return True
+
+        host = urlsplit(image_url).netloc
+        metrics = get_metrics()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                if not self.breaker.allow(host):
+                    raise CircuitOpenError("circuit of %s is open" % host)
+                self.fetch_once(image_url, filename, writer)
+            except (requests.RequestException, OSError, CircuitOpenError) as e:
+                retryable = is_retryable(e)
+                if is_host_failure(e):
+                    self.breaker.record_failure(host)
+                elif isinstance(e, requests.HTTPError):
+                    # the host answered, a 404 closes a half open circuit like a success
+                    self.breaker.record_success(host)
+                # the circuit stays open longer than the backoff, waiting for it is useless
+                if retryable and attempt < self.max_attempts and not isinstance(e, CircuitOpenError):
+                    metrics.count("download_retries")
+                    time.sleep(get_backoff(attempt, e))
+                    continue
+                logging.error(
+                    "Can't download image %s after %s attempts. Reason: %s"
+                    % (image_url, attempt, e)
+                    )
+                self.record_failure(filename, image_url, e, attempt, retryable)
+                return False
+
+            self.breaker.record_success(host)
+            return True
+
+    def fetch_once(self, image_url: str, filename: str, writer) -> None:
+        """
+        This function makes a single attempt to download an image and save it with the writer.
+
+        :raises requests.RequestException: if the request fails or the response is an error.
+        :raises OSError: if the image can't be saved.
+        """
+        if self.cache is None:
+            with self.session.get(image_url, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+                writer.write(filename, get_metrics().count_chunks("download_bytes", chunks))
+        else:
+            with self.fetch_with_cache(image_url) as handler:
+                writer.write(filename, iter(lambda: handler.read(CHUNK_SIZE), b""))
+
+    def record_failure(
+            self,
+            filename: str,
+            image_url: str,
+            error: Exception,
+            attempts: int,
+            retryable: bool
+            ) -> None:
+        with self.lock:
+            self.failures[filename] = {
+                "url": image_url,
+                "error": get_error_reason(error),
+                "attempts": attempts,
+                "retryable": retryable
+                }
+        get_metrics().count("images_failed")
+
+    def log_summary(self) -> None:
+        """
+        Log the number of images that couldn't be downloaded, grouped by reason
+        """
+        if len(self.failures) == 0:
+            return
+        reasons = {}
+        for failure in self.failures.values():
+            reasons[failure["error"]] = reasons.get(failure["error"], 0) + 1
+        logging.error(
+            "[downloading] %s images couldn't be downloaded: %s"
+            % (len(self.failures), ", ".join(
+                "%s x%s" % (reason, count)
+                for reason, count in sorted(reasons.items(), key=lambda item: -item[1])
+                ))
+            )
+
+    def fetch_with_cache(self, image_url: str, retry: bool = True):
+        """
+        This function makes sure the image is stored and fresh in the cache. Fresh entries don't touch
+        the network, stale entries are revalidated with a conditional GET and misses are downloaded.
+        An entry evicted by another run sharing the cache is a miss.
+
+        :param image_url: The image url
+        :type image_url: str
+        :param retry: If True, an image evicted by another run before it is read is downloaded again
+        :type retry: bool
+        :return: the cached image opened for reading.
+        """
+        entry = self.cache.lookup(image_url)
+        if entry is not None and entry["fresh"]:
+            self.cache.touch(image_url)
+            handler = self.cache.open(image_url)
+            if handler is not None:
+                self.cache.count("hits")
+                return handler
+            entry = None
+
+        headers = {} if entry is None else self.cache.conditional_headers(entry)
+        with self.session.get(
+                image_url,
+                headers=headers,
+                timeout=self.timeout,
+                stream=True
+                ) as response:
+            if response.status_code == 304 and entry is not None:
+                self.cache.touch(image_url, response.headers)
+                handler = self.cache.open(image_url)
+                if handler is not None:
+                    self.cache.count("revalidated")
+                    return handler
+            else:
+                response.raise_for_status()
+                self.cache.store(
+                    image_url,
+                    get_metrics().count_chunks(
+                        "download_bytes",
+                        response.iter_content(chunk_size=CHUNK_SIZE)
+                        ),
+                    response.headers
+                    )
+                self.cache.count("misses")
+                handler = self.cache.open(image_url)
+                if handler is not None:
+                    return handler
+
+        # evicted by another run, downloaded again once this connection is released
+        if not retry:
+            raise OSError("%s was evicted from the cache before being read" % image_url)
+        return self.fetch_with_cache(image_url, retry=False)
+
+    def download_all(self, data: list, writer) -> int:
+        """
+        The function downloads every image in data using a pool of workers.
+
+        :param data: A list of lists, where each inner list contains the image name and the image url
+        :type data: list
+        :param writer: `FolderWriter` or `ZipWriter` where the images will be saved
+        :return: the number of images saved.
+        """
+        if len(data) == 0:
+            return 0
+
+        workers = min(self.workers, len(data))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda row: self.fetch(row, writer), data)
+            downloaded = sum(1 for saved in results if saved)
+
+        return downloaded
+
+    def close(self) -> None:
+        """
+        Close the session and its pooled connections
+        """
+        self.session.close()
+
+
+
+def get_error_reason(error: Exception) -> str:
+    """
+    This function describes a download error in a few words, so the failures can be grouped.
+    """
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return "HTTP %s" % error.response.status_code
+    if isinstance(error, CircuitOpenError):
+        return "circuit open"
+    return type(error).__name__
+
+
+def remove_zip_entry(zip_path: str, name: str) -> None:
+    """
+    This function removes an entry from a zip file, copying the other entries to a new zip that
+    replaces it. The zip format can't remove an entry in place.
+    """
+    tmp_path = zip_path + ".tmp"
+    with zipfile.ZipFile(zip_path) as source, \
+            zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED) as target:
+        for info in source.infolist():
+            if info.filename == name:
+                continue
+            with source.open(info) as entry, target.open(info.filename, 'w') as copy:
+                shutil.copyfileobj(entry, copy, CHUNK_SIZE)
+    os.replace(tmp_path, zip_path)
 
 def count_items_in_directory(path: str) -> int:
     """
-    The function counts the number of files in a given directory path.
+    The function counts the number of files in a given directory path. Partial files of images still
+    being written aren't counted.
 
     :param path: The path parameter is a string that represents the directory path for which we want to
     count the number of files
@@ -16,12 +622,12 @@ def count_items_in_directory(path: str) -> int:
     """
     count = 0
     for file in os.listdir(path):
-        if os.path.isfile(os.path.join(path, file)):
+        if not file.endswith(PART_SUFFIX) and os.path.isfile(os.path.join(path, file)):
             count += 1
 
     return count
 
-def download(data: list, image_folder: str) -> None:
+def download(data: list, image_folder: str, downloader: ImageDownloader = None) -> None:
     """
     The function downloads images from URLs in a given data set and saves them to a specified folder.
 
@@ -30,65 +636,132 @@ def download(data: list, image_folder: str) -> None:
     downloaded image, and the second element is the URL where the image can be found
     :param image_folder: The image_folder parameter is a string representing the path to the folder
     where the downloaded images will be saved
+    :param downloader: Optional `ImageDownloader` to reuse. If it isn't given, a new one is created
+    and closed when the download ends
     """
-    for row in data:
-        filename = row[0]
-        image_url = row[1]
-        if image_url != "N/A":
-            # img buffer
-            img_data = requests.get(image_url).content
-            # output / filename
-            file_path = os.path.join(image_folder, filename)
-            # save the image to the given path
-            with open(file_path, 'wb') as handler:
-                handler.write(img_data)
+    writer = FolderWriter(image_folder)
+    if downloader is not None:
+        downloader.download_all(data, writer)
+        return
+
+    downloader = ImageDownloader()
+    try:
+        downloader.download_all(data, writer)
+    finally:
+        downloader.close()
+
+def zip_images(output_path: str, directory: str, archive_name: str = "images") -> str:
+    filename = os.path.join(output_path, archive_name)
+    return shutil.make_archive(filename, 'zip', directory)
+
+def create_writer(
+        stream_to_zip: bool = False,
+        archive_name: str = "images",
+        image_folder: str = None,
+        zip_path: str = None
+        ):
+    """
+    This function creates the writer of the images of a run.
 
-def zip_images(output_path: str, directory: str) -> None:
-    filename = os.path.join(output_path, "images")
-    shutil.make_archive(filename, 'zip', directory)
+    :param stream_to_zip: If True, the images are written straight into the zip file, otherwise they
+    are saved in the image folder
+    :type stream_to_zip: bool
+    :param archive_name: Name of the zip file in the output directory, without extension
+    :type archive_name: str
+    :param image_folder: Folder of the images, defaults to `output/images`
+    :type image_folder: str
+    :param zip_path: Zip file where the images are streamed, defaults to the archive in the output
+    directory. A zip given here is reopened and only the missing images are added to it
+    :type zip_path: str
+    :return: a `ZipWriter` or a `FolderWriter`.
+    """
+    output_path = get_output_path()
+    if stream_to_zip:
+        if zip_path is not None:
+            return ZipWriter(zip_path, append=True)
+        return ZipWriter(os.path.join(output_path, archive_name + ".zip"))
+    return FolderWriter(image_folder or os.path.join(output_path, 'images'))
 
-def download_images(data: list) -> None:
+def download_images(
+        data: list,
+        workers: int = DEFAULT_WORKERS,
+        connections_per_host: int = DEFAULT_CONNECTIONS_PER_HOST,
+        timeout: tuple = DEFAULT_TIMEOUT,
+        stream_to_zip: bool = False,
+        use_cache: bool = True,
+        archive_name: str = "images",
+        writer=None,
+        image_folder: str = None,
+        zip_path: str = None
+        ) -> str:
     """
     This function downloads a list of images from URLs and saves them to a specified output path.
 
     :param data: A list of tuples containing the name and URL of images to be downloaded. The first
     element of each tuple is the image name and the second element is the image URL
     :type data: list
+    :param workers: Number of images downloaded at the same time
+    :type workers: int
+    :param connections_per_host: Maximum number of open connections against a single host
+    :type connections_per_host: int
+    :param timeout: (connect, read) timeout in seconds applied to every request
+    :type timeout: tuple
+    :param stream_to_zip: If True, the images are written straight into the zip file while they
+    are downloaded and the `output/images` folder is not used. If False, the images are saved in the
+    folder and zipped at the end
+    :type stream_to_zip: bool
+    :param use_cache: If True, images are served from the persistent image cache and only misses or
+    stale entries are requested to the server
+    :type use_cache: bool
+    :param archive_name: Name of the zip file in the output directory, without extension
+    :type archive_name: str
+    :param writer: Optional writer created by `create_writer` with the same `stream_to_zip` and
+    `archive_name`, where some images were already saved. They aren't downloaded again and the
+    writer is closed at the end
+    :param image_folder: Folder of the images when they aren't streamed to the zip, defaults to
+    `output/images`. Images already in the folder aren't downloaded again
+    :type image_folder: str
+    :param zip_path: Zip file where the images are streamed when `stream_to_zip` is True, like the
+    zip of a checkpoint. Images already in it aren't downloaded again, and it is moved to the output
+    directory at the end
+    :type zip_path: str
+    :return: the path of the zip file with the images.
     """
     logging.info("Starting [downloading][download_images]")
     #  0 image name | 1 image url
     output_path = get_output_path()
-    image_folder = os.path.join(output_path, 'images')
-    img_qty = 0
+    image_folder = image_folder or os.path.join(output_path, 'images')
     items_downloaded = 0
 
-    condition = True
-
-    tries = 3
-
-    while condition:
-        # get quantity of images to download
-        img_qty = len(data)
-
-        # if images to download are zero, finish the execution
-        if img_qty == 0:
-            condition = False
-
-        # if images aren't equal to the items downloaded, it tries to download the files
-        if img_qty != items_downloaded:
-            download(data, image_folder)
-            tries = tries-1
+    archive_path = os.path.join(output_path, archive_name + ".zip")
+    if writer is None:
+        writer = create_writer(stream_to_zip, archive_name, image_folder, zip_path)
 
-        # get a fresh count of items downloaded
-        items_downloaded = count_items_in_directory(image_folder)
+    cache = ImageCache() if use_cache else None
+    downloader = ImageDownloader(workers, connections_per_host, timeout, cache)
 
-        # if images are equal to the items downloaded, it finish the execution
-        if img_qty == items_downloaded:
-            condition = False
+    metrics = get_metrics()
+    # in stream mode the zip is written while downloading, so it is part of this stage
+    with metrics.stage("download"):
+        try:
+            # every image is retried on its own, only the failed ones are requested again
+            downloader.download_all(data, writer)
+            items_downloaded = writer.count()
+            downloader.log_summary()
+        finally:
+            downloader.close()
+            writer.close()
+            if cache is not None:
+                cache.close()
 
-        # Avoid infinite loop if after 3 intents it can't download all images
-        if tries == 0:
-            condition = False
+    if not stream_to_zip:
+        with metrics.stage("zip"):
+            zip_images(output_path, image_folder, archive_name)
+    elif zip_path is not None:
+        shutil.move(zip_path, archive_path)
 
-    zip_images(output_path, image_folder)
-    logging.info("Ending [downloading][download_images]")
\ No newline at end of file
+    metrics.count("images_saved", items_downloaded)
+    if os.path.exists(archive_path):
+        metrics.count("archive_bytes", os.path.getsize(archive_path))
+    logging.info("Ending [downloading][download_images]")
+    return archive_path
\ No newline at end of file
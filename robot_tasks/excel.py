@@ -1,36 +1,98 @@
-import os, logging
+import os, csv, logging
 from datetime import datetime
+from itertools import islice
 
 from openpyxl import Workbook
 
-from .utils import get_output_path, get_variable
+from .config import RunConfig, get_config
+from .utils import get_output_path
+
+HEADERS = [
+    'title',
+    'date',
+    'description',
+    'image name',
+    'contains money',
+    'count search phrase',
+    'money amounts'
+    ]
+
+# Rows written to parquet per row group
+PARQUET_BATCH_SIZE = 10000
+# Position of the money amounts in the rows, a list of floats
+AMOUNTS_COLUMN = 6
+
+
+def format_amounts(amounts: list) -> str:
+    """
+    The function formats a list of amounts as text for a single cell, like "5000000; 12.5".
+    """
+    return "; ".join(
+        str(int(amount)) if amount.is_integer() else str(amount)
+        for amount in amounts
+        )
+
+
+def to_flat_row(row: list) -> list:
+    """
+    This function returns a copy of a row with the money amounts joined in a single cell, for the
+    formats that can't store a list, Excel and csv.
+    """
+    flat_row = list(row)
+    flat_row[AMOUNTS_COLUMN] = format_amounts(row[AMOUNTS_COLUMN])
+    return flat_row
+
+
+def get_results_file_path(extension: str, suffix: str = "") -> str:
+    """
+    This function returns the path of the results file in the output directory, named with the
+    current date and time.
+
+    :param extension: The file extension without dot, like "xlsx"
+    :type extension: str
+    :param suffix: Text added after the date, to tell apart files created in the same second
+    :type suffix: str
+    :return: the absolute path of the results file.
+    """
+    today= datetime.now()
+    today_str= today.strftime("%m_%d_%Y__%H_%M_%S")
+    file_name= f"searching_results_{today_str}{suffix}.{extension}"
+
+    output_path = get_output_path()
+    return os.path.join(output_path, file_name)
 
 
 class CreateWorkbook:
     def __init__(
         self,
-        data: list,
-        search: str
+        data,
+        search: str,
+        write_only: bool = False,
+        suffix: str = ""
     ):
-        self.workbook = Workbook()
-        self.worksheet = self.workbook.active
+        """
+        :param data: The rows to write. It can be a list or any iterable, like a generator, rows are
+        consumed only once
+        :param search: The search term, used as the worksheet title
+        :param write_only: If True, the workbook uses an openpyxl write-only worksheet. Rows are
+        streamed to the file instead of being kept in memory, so memory doesn't grow with the results
+        :param suffix: Text added to the file name after the date
+        """
+        self.workbook = Workbook(write_only=write_only)
+        if write_only:
+            # write-only workbooks don't have an active worksheet
+            self.worksheet = self.workbook.create_sheet()
+        else:
+            self.worksheet = self.workbook.active
         self.data = data
         self.search = search
+        self.suffix = suffix
 
     def write_headers(self) -> None:
         """
         This function writes a list of headers to a worksheet in a spreadsheet.
         """
-        headers = [
-            'title',
-            'date',
-            'description',
-            'image name',
-            'contains money',
-            'count search phrase'
-            ]
-
-        self.worksheet.append(headers)
+        self.worksheet.append(HEADERS)
 
     def set_title(self) -> None:
         """
@@ -43,41 +105,111 @@ class CreateWorkbook:
         The function writes the data in rows to a worksheet.
         """
         # 0 title | 1 date | 2 description | 3 image name
-        # 4 image_url | 5 contains money | 6 count search phrases
+        # 4 contains money | 5 count search phrases | 6 money amounts
         for row in self.data:
-            self.worksheet.append(row)
+            self.worksheet.append(to_flat_row(row))
 
 
-    def save_document(self) -> None:
+    def save_document(self) -> str:
         """
-        This function saves a workbook as an Excel file in a specified directory.
+        This function saves a workbook as an Excel file in the output directory, named
+        "searching_results_<date>.xlsx".
 
-        :param file_name: The name of the file to be saved. If no name is provided, the default name
-        "searching_results.xlsx" will be used, defaults to searching_results.xlsx (optional)
+        :return: the path of the saved file.
         """
-
-        today= datetime.now()
-        today_str= today.strftime("%m_%d_%Y__%H_%M_%S")
-        file_name= f"searching_results_{today_str}.xlsx"
-
-        output_path = get_output_path()
-        final_path = os.path.join(output_path, file_name)
+        final_path = get_results_file_path("xlsx", self.suffix)
 
         self.workbook.save(final_path)
+        return final_path
 
-    def create_excel_file(self) -> None:
+    def create_excel_file(self) -> str:
         """
         This function creates an Excel file by setting the title, writing headers and content, and
         saving the document.
+
+        :return: the path of the saved file.
         """
         self.set_title()
         self.write_headers()
         self.write_content()
-        self.save_document()
-
-def create_file(data: list) -> None:
+        return self.save_document()
+
+
+def create_csv_file(data, suffix: str = "") -> str:
+    """
+    This function writes the rows to a csv file in the output directory, one row at a time.
+
+    :param data: The rows to write, a list or any iterable
+    :param suffix: Text added to the file name after the date
+    :return: the path of the saved file.
+    """
+    final_path = get_results_file_path("csv", suffix)
+    with open(final_path, "w", newline="", encoding="utf-8") as handler:
+        writer = csv.writer(handler)
+        writer.writerow(HEADERS)
+        writer.writerows(to_flat_row(row) for row in data)
+
+    return final_path
+
+
+def create_parquet_file(data, suffix: str = "") -> str:
+    """
+    This function writes the rows to a parquet file in the output directory, in row groups of
+    `PARQUET_BATCH_SIZE` rows, so only one batch is in memory at a time.
+
+    :param data: The rows to write, a list or any iterable
+    :param suffix: Text added to the file name after the date
+    :return: the path of the saved file.
+    :raises ImportError: if pyarrow isn't installed.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("title", pa.string()),
+        ("date", pa.string()),
+        ("description", pa.string()),
+        ("image name", pa.string()),
+        ("contains money", pa.bool_()),
+        ("count search phrase", pa.int64()),
+        ("money amounts", pa.list_(pa.float64()))
+        ])
+
+    final_path = get_results_file_path("parquet", suffix)
+    rows = iter(data)
+    with pq.ParquetWriter(final_path, schema) as writer:
+        while True:
+            batch = list(islice(rows, PARQUET_BATCH_SIZE))
+            if len(batch) == 0:
+                break
+            columns = [list(column) for column in zip(*batch)]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+
+    return final_path
+
+
+def create_file(data, config: RunConfig = None, suffix: str = "") -> str:
+    """
+    This function writes the results in the format selected in the run configuration: "xlsx" (the
+    default), "csv" or "parquet".
+
+    :param data: The rows to write, a list or any iterable
+    :param config: The run configuration, defaults to the loaded one
+    :type config: RunConfig
+    :param suffix: Text added to the file name after the date
+    :type suffix: str
+    :return: the path of the results file.
+    """
     logging.info("Starting [excel][create_file]")
-    search = get_variable("search")
-    create_workbook = CreateWorkbook(data, search)
-    create_workbook.create_excel_file()
-    logging.info("Starting [excel][create_file]")
\ No newline at end of file
+    config = config or get_config()
+
+    if config.output_format == "csv":
+        final_path = create_csv_file(data, suffix)
+    elif config.output_format == "parquet":
+        final_path = create_parquet_file(data, suffix)
+    else:
+        create_workbook = CreateWorkbook(data, config.search, config.stream_excel, suffix)
+        final_path = create_workbook.create_excel_file()
+
+    logging.info("Ending [excel][create_file]")
+    return final_path
@@ -1,14 +1,46 @@
+import os
+import json
+import time
 import logging
 from datetime import date, datetime
 from dateutil.relativedelta import relativedelta
 
 from selenium.common.exceptions import (
     NoSuchElementException,
-    StaleElementReferenceException)
+    StaleElementReferenceException,
+    WebDriverException)
 from selenium.webdriver.common.by import By
 from RPA.Browser.Selenium import Selenium
 
-from .utils import get_variable, accept_cookies
+from .config import RunConfig, get_config
+from .utils import accept_cookies, get_cache_path
+
+FACET_TYPES = ["section", "type"]
+# Seconds the section and type lists are reused before reading them again from the page
+FACETS_MAX_AGE = 24 * 60 * 60
+
+LI_SPAN_TEXT = "//li[@class='css-1qtb2wd']//span[@class='css-16eo56s']"
+LI_SPAN_NEWS_QTY = ".//span[@class='css-17fq56o']"
+
+# Reads every option of the opened dropdown in a single WebDriver call, removing the news quantity
+# from the text like the element by element path does. The value of the option checkbox is the one
+# used by the search url
+FACETS_SCRIPT = r"""
+const [textXpath, qtyXpath] = arguments;
+const items = document.evaluate(
+    textXpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const values = [];
+for (let i = 0; i < items.snapshotLength; i++) {
+    const item = items.snapshotItem(i);
+    const qty = document.evaluate(
+        qtyXpath, item, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    const text = item.innerText;
+    const label = item.closest("label");
+    const input = label ? label.querySelector("input") : null;
+    values.push([qty ? text.replace(qty.innerText, "") : text, input ? input.value : null]);
+}
+return values;
+"""
 
 def generic_apply_filter(
         browser: Selenium,
@@ -58,27 +90,16 @@ def get_type_or_section_button(type: str) -> str:
 
 
 
-def generic_get_values_from_ul(browser: Selenium, type: str) -> list:
+def get_values_from_ul_by_element(browser: Selenium) -> list:
     """
-    This function retrieves values from a specific type of unordered list (ul) element on a webpage
-    using Selenium.
+    This function reads the options of the opened dropdown with a `get_text` and a `find_element`
+    call per option. It is used when the bulk script can't run.
 
     :param browser: The Selenium browser object used to interact with the web page
     :type browser: Selenium
-    :param type: The "type" parameter is a string that specifies the type of section to retrieve values
-    from. It is used to locate and click the corresponding button before retrieving the values
-    :type type: str
-    :return: a list of strings, which are the text values of the sections obtained from an unordered
-    list (ul) element on a web page. The function uses Selenium to interact with the web page and
-    extract the text values.
+    :return: a list with the text of every option, without the news quantity.
     """
-    button = get_type_or_section_button(type)
-    browser.click_button(button)
-
-    li_span_text = "//li[@class='css-1qtb2wd']//span[@class='css-16eo56s']"
-    li_span_news_qty = ".//span[@class='css-17fq56o']"
-
-    section = browser.get_webelements(li_span_text)
+    section = browser.get_webelements(LI_SPAN_TEXT)
     sections = []
 
     # iter WebElements
@@ -87,7 +108,7 @@ def generic_get_values_from_ul(browser: Selenium, type: str) -> list:
             # Get hole span text
             span_text = browser.get_text(item)
             # Get news qty in text
-            news_qty = item.find_element(By.XPATH, li_span_news_qty)
+            news_qty = item.find_element(By.XPATH, LI_SPAN_NEWS_QTY)
             news_qty_text = browser.get_text(news_qty)
             # Remove the news qty from the text
             text = span_text.replace(news_qty_text, '')
@@ -100,6 +121,122 @@ def generic_get_values_from_ul(browser: Selenium, type: str) -> list:
     return sections
 
 
+def get_options_from_ul(browser: Selenium, type: str) -> list:
+    """
+    This function opens the section or type dropdown and reads its options with a single script
+    execution, falling back to reading them one by one if the script fails.
+
+    :param browser: The Selenium browser object used to interact with the web page
+    :type browser: Selenium
+    :param type: "section" or "type"
+    :type type: str
+    :return: a list of [text, value] pairs, the value of the option checkbox is None when it is read
+    one by one.
+    """
+    button = get_type_or_section_button(type)
+    browser.click_button(button)
+
+    try:
+        return browser.driver.execute_script(FACETS_SCRIPT, LI_SPAN_TEXT, LI_SPAN_NEWS_QTY)
+    except WebDriverException as e:
+        logging.error(
+            "Bulk read of the %s options failed, reading them one by one. Reason: %s" % (type, e))
+        return [[text, None] for text in get_values_from_ul_by_element(browser)]
+
+
+def generic_get_values_from_ul(browser: Selenium, type: str) -> list:
+    """
+    This function retrieves values from a specific type of unordered list (ul) element on a webpage
+    using Selenium. Every option is read with a single script execution, falling back to reading
+    them one by one if the script fails.
+
+    :param browser: The Selenium browser object used to interact with the web page
+    :type browser: Selenium
+    :param type: The "type" parameter is a string that specifies the type of section to retrieve values
+    from. It is used to locate and click the corresponding button before retrieving the values
+    :type type: str
+    :return: a list of strings, which are the text values of the sections obtained from an unordered
+    list (ul) element on a web page. The function uses Selenium to interact with the web page and
+    extract the text values.
+    """
+    return [text for text, _ in get_options_from_ul(browser, type)]
+
+
+def get_facets_path() -> str:
+    return os.path.join(get_cache_path("facets"), "facets.json")
+
+
+def load_cached_facets(max_age: int = FACETS_MAX_AGE) -> dict:
+    """
+    This function reads the section and type lists saved by a previous run.
+
+    :param max_age: Seconds the saved lists are valid
+    :type max_age: int
+    :return: a dictionary with "section" and "type" lists and the "values" of the options, or None if
+    they weren't saved, can't be read or are older than `max_age`.
+    """
+    try:
+        with open(get_facets_path()) as handler:
+            cached = json.load(handler)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - cached.get("saved_at", 0) > max_age:
+        return None
+    if not all(isinstance(cached.get(type), list) for type in FACET_TYPES):
+        return None
+    facets = {type: cached[type] for type in FACET_TYPES}
+    facets["values"] = {type: (cached.get("values") or {}).get(type, {}) for type in FACET_TYPES}
+    return facets
+
+
+def save_facets(facets: dict) -> None:
+    """
+    This function saves the section and type lists for the next runs. The file is replaced atomically.
+    """
+    final_path = get_facets_path()
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    tmp_path = final_path + ".tmp"
+    with open(tmp_path, "w") as handler:
+        json.dump(dict(facets, saved_at=time.time()), handler)
+    os.replace(tmp_path, final_path)
+
+
+def get_facets(browser: Selenium, selections: list, use_cache: bool = True) -> dict:
+    """
+    This function returns the available sections and types and the search url value of every
+    option. When they were saved less than `FACETS_MAX_AGE` seconds ago and they contain every
+    selection, the dropdowns aren't opened.
+
+    :param browser: The Selenium browser object used to interact with the web page
+    :type browser: Selenium
+    :param selections: The sections or types selected in the work item
+    :type selections: list
+    :param use_cache: If False, the lists are always read from the page
+    :type use_cache: bool
+    :return: a dictionary with "section" and "type" lists and a "values" dictionary with the search
+    url value of every option, by type and text.
+    """
+    if use_cache:
+        facets = load_cached_facets()
+        if facets is not None:
+            available = set(facets["section"]).union(facets["type"])
+            if selections == ["Any"] or set(selections).issubset(available):
+                logging.info("Using the saved sections and types")
+                return facets
+            # a new option may have been added since the lists were saved
+            logging.info("Some selections aren't in the saved sections and types, reading them again")
+
+    facets = {"values": {}}
+    for type in FACET_TYPES:
+        options = get_options_from_ul(browser, type)
+        facets[type] = [text for text, _ in options]
+        facets["values"][type] = {text: value for text, value in options if value}
+    if use_cache:
+        save_facets(facets)
+    return facets
+
+
 def get_search_months(month: str) -> dict:
     """
     This function returns the start and end dates for a search period of either 1 or 2 months ago.
@@ -211,23 +348,25 @@ def determine_type_or_section(news_section: list, news_type: list, options: list
         return "section"
 
 
-def filter_category_news(browser: Selenium) -> None:
+def filter_category_news(browser: Selenium, config: RunConfig = None) -> None:
     logging.info("Starting [filtering][filter_category_news]")
-    selections = get_variable("category_or_section")
-    month = get_variable("months")
+    config = config or get_config()
+    selections = config.category_or_section
+    month = config.months
 
     accept_cookies(browser)
 
     filter_news_by_dates(browser, month)
     set_recent_news(browser)
 
-    news_sections = generic_get_values_from_ul(browser, "section")
-    news_types = generic_get_values_from_ul(browser, "type")
-
     selections_count = len(selections)
     if selections_count == 0:
         selections = ["Any"]
 
+    facets = get_facets(browser, selections, config.use_cache)
+    news_sections = facets["section"]
+    news_types = facets["type"]
+
     type_or_section = determine_type_or_section(
             news_sections,
             news_types,
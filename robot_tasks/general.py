@@ -3,10 +3,30 @@ from .utils import get_output_path, get_screenshot_path
 import os, shutil, sys
 import logging
 
-from RPA.Robocorp.WorkItems import WorkItems
 from RPA.Browser.Selenium import Selenium
 
+from .config import RunConfig, get_config, load_config
+from .browser_profile import acquire_profile, release_profile
+from .metrics import get_metrics
 
+# Browser profile used to scrape: headless, without images, media, fonts, ads or analytics
+SCRAPE_WINDOW_SIZE = (1366, 900)
+BLOCKED_URLS = [
+    # images and media
+    "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.svg*",
+    "*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*",
+    # fonts
+    "*.woff*", "*.ttf*", "*.otf*",
+    # ads and analytics
+    "*doubleclick.net*", "*googlesyndication.com*", "*googletagmanager.com*",
+    "*google-analytics.com*", "*amazon-adsystem.com*", "*adsrvr.org*",
+    "*scorecardresearch.com*", "*chartbeat.com*", "*chartbeat.net*",
+    "*facebook.net*", "*criteo.com*", "*taboola.com*", "*outbrain.com*",
+    "*moatads.com*", "*nr-data.net*", "*brandmetrics.com*"
+    ]
+
+# (browser_profile, persistent_profile) of the open browser, a work item with others reopens it
+_browser_settings = None
 
 def configure_browser() -> Selenium:
     """
@@ -18,22 +38,102 @@ def configure_browser() -> Selenium:
     browser = Selenium(screenshot_root_directory=screenshot_path)
     return browser
 
-def open_site(browser: Selenium) -> None:
+def get_browser_options(profile: str) -> dict:
+    """
+    This function returns the arguments of `open_available_browser` for a browser profile.
+
+    :param profile: "scrape" for a lean headless browser, anything else for the default browser
+    :type profile: str
+    :return: a dictionary with the keyword arguments for `open_available_browser`.
+    """
+    if profile != "scrape":
+        return {}
+
+    return {
+        "headless": True,
+        "options": {
+            "arguments": [
+                "--window-size=%s,%s" % SCRAPE_WINDOW_SIZE,
+                "--blink-settings=imagesEnabled=false",
+                "--mute-audio",
+                "--disable-extensions",
+                "--disable-background-networking"
+                ],
+            # don't wait for stylesheets, images and subframes, only the DOM
+            "capabilities": {"pageLoadStrategy": "eager"}
+            }
+        }
+
+def block_resources(browser: Selenium) -> None:
+    """
+    This function blocks images, media, fonts and known ad/analytics hosts in Chromium based browsers.
+    Other browsers only get the options of the profile.
+
+    :param browser: The Selenium instance with an open browser
+    :type browser: Selenium
     """
-    Opens the New York Times website in an available web browser.
+    driver = browser.driver
+    if not hasattr(driver, "execute_cdp_cmd"):
+        logging.info("Resource blocking is only supported in Chromium based browsers")
+        return
+
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+
+def open_site(browser: Selenium, config: RunConfig = None, url: str = None) -> None:
     """
+    Opens the New York Times website in an available web browser. If the browser is already open, it
+    navigates to the home page instead, which resets the search state but keeps the session. A browser
+    opened with another "browser_profile" or "persistent_profile", like the one of the previous work
+    item of a batch, is closed and opened again with the options of this configuration.
+
+    With the "persistent_profile" option the browser is started with a profile directory kept between
+    runs, so the consent cookies and the HTTP disk cache are already there.
+
+    :param config: The run configuration with the browser profile, defaults to the loaded one
+    :param url: The page to open, defaults to the home page
+    """
+    global _browser_settings
     logging.info("Starting [general][open_site]")
-    url = 'https://www.nytimes.com/'
-    browser.open_available_browser(url)
+    url = url or 'https://www.nytimes.com/'
+    config = config or get_config()
+    profile = config.browser_profile
+    settings = (profile, config.persistent_profile)
+    if len(browser.get_browser_ids()) > 0:
+        if settings == _browser_settings:
+            browser.go_to(url)
+            logging.info("Ending [general][open_site]")
+            return
+        logging.info("The browser options changed, opening the browser again")
+        close_browser_instance(browser)
+
+    options = get_browser_options(profile)
+    if config.persistent_profile:
+        browser_profile = acquire_profile()
+        if browser_profile is not None:
+            options.update({"use_profile": True, "profile_path": browser_profile.path})
+            get_metrics().count("browser_profile_warm", int(browser_profile.warm))
+
+    if profile == "scrape":
+        # resources are blocked before loading the site
+        browser.open_available_browser(**options)
+        block_resources(browser)
+        browser.go_to(url)
+    else:
+        browser.open_available_browser(url, **options)
+    _browser_settings = settings
     logging.info("Ending [general][open_site]")
 
 def close_browser_instance(browser: Selenium) -> None:
     """
-    Close the browser instance
+    Close the browser instance and unlock its persistent profile
     """
+    global _browser_settings
     logging.info("Starting [general][close_browser_instance]")
-    browser.close_browser
-    logging.info("Starting [general][close_browser_instance]")
+    browser.close_browser()
+    release_profile()
+    _browser_settings = None
+    logging.info("Ending [general][close_browser_instance]")
 
 def check_path_and_clean(path) -> None:
     """
@@ -62,16 +162,18 @@ def check_path_and_clean(path) -> None:
 
 def check_excel_files(path):
     """
-    This function cleans excel files in a specified directory by deleting them.
+    This function cleans results files (excel, csv and parquet) in a specified directory by deleting
+    them.
 
     :param path: The parameter "path" is a string that represents the directory path where the function
     will look for Excel files to clean
     """
-    # cleans excel files in the output directory
+    extensions = (".xlsx", ".csv", ".parquet")
+    # cleans results files in the output directory
     for filename in os.listdir(path):
             file_path = os.path.join(path, filename)
             # identify if is file or directory and try to delete it
-            if ".xlsx" in str(filename):
+            if str(filename).endswith(extensions):
                 try:
                     if os.path.isfile(file_path) or os.path.islink(file_path):
                         os.unlink(file_path)
@@ -82,29 +184,23 @@ def check_excel_files(path):
 
 def check_variables() -> None:
     """
-    The function checks if three required variables are present in a Work Item and exits the program if
-    they are not.
+    The function loads the run configuration from the Work Item once and validates that the three
+    required variables are present. It raises the error if they are not.
     """
-    try:
-        wi = WorkItems()
-        wi.get_input_work_item()
+    load_config()
 
-        SEARCH = wi.get_work_item_variable("search")
-        CATEGORY_OR_SECTION = wi.get_work_item_variable("category_or_section")
-        MONTHS = wi.get_work_item_variable("months")
-    except KeyError as e:
-        logging.ERROR("This robot needs 3 variables to run: search, category_or_section and months")
-        logging.ERROR("Set them from the control room")
-        logging.ERROR(e)
-
-def init_process() -> Selenium:
+def init_process(validate_variables: bool = True) -> Selenium:
     """
     The function performs checks on the output path, including checking the images directory and Excel
     files. Also initialize the browser instance and return it
+
+    :param validate_variables: If False, the work item variables aren't validated here. The batch
+    runner validates every work item on its own
     """
     logging.info("Starting [general][init_process]")
     browser = configure_browser()
-    check_variables()
+    if validate_variables:
+        check_variables()
     output_path = get_output_path()
     images_path = os.path.join(output_path, "images")
     screenshots_path = os.path.join(output_path, "screenshots")
@@ -0,0 +1,148 @@
+import os
+import re
+import hashlib
+import logging
+from urllib.parse import urlsplit
+
+from .utils import clean_image_url
+
+# Suffixes of the renditions of a NYT image, like "-threeByTwoSmallAt2X" or "-articleLarge". The
+# same photo is published with one suffix per size and crop. Some names end with a width, like
+# "-mediumThreeByTwo440", or a density, like "-mobileMasterAt3X"
+RENDITION_NAMES = [
+    "threeByTwoSmall", "threeByTwoMedium", "threeByTwoLarge", "articleLarge", "articleInline",
+    "superJumbo", "jumbo", "popup", "thumbStandard", "thumbLarge", "thumbWide", "mediumThreeByTwo",
+    "mediumSquare", "square", "videoSixteenByNine", "videoSixteenByNineJumbo", "videoLarge",
+    "videoThumb", "facebookJumbo", "blog", "blogSmallThumb", "blogSmallInline", "master", "hpLarge",
+    "hpMedium", "hpSmall", "mobileMaster", "verticalTwoByThree", "horizontalMedium",
+    "largeHorizontal", "largeVertical", "largeWidescreen", "filmstrip", "moth", "sfSpan", "watch",
+    "googleFourByThree", "tmagArticle", "tmagSF", "slide", "limitedSF", "mediumFlexible"
+    ]
+RENDITION_PATTERN = re.compile(r"-(?:%s)(?:\d+|At\dX)?$" % "|".join(RENDITION_NAMES))
+
+# Renditions kept when an asset is found with several of them, first is better. The search results
+# show "threeByTwoSmallAt2X", it is small and good enough for the report
+PREFERRED_RENDITIONS = [
+    "threeByTwoSmallAt2X",
+    "threeByTwoMediumAt2X",
+    "articleLarge",
+    "mediumThreeByTwo440",
+    "superJumbo",
+    "jumbo"
+    ]
+
+# Characters allowed in the image file names
+UNSAFE_CHARACTERS = re.compile(r"[^A-Za-z0-9._-]+")
+MAX_STEM_LENGTH = 80
+
+
+def split_image_url(image_url: str) -> dict:
+    """
+    This function splits an image url into the parts used to identify the image.
+
+    :param image_url: The image url, like
+    https://static01.nyt.com/images/2023/04/18/multimedia/18ai/18ai-threeByTwoSmallAt2X.jpg?quality=75
+    :type image_url: str
+    :return: a dictionary with the "asset" key shared by every rendition of the image (host and path
+    without rendition suffix nor extension), its "stem", the "rendition" suffix or None and the
+    "extension".
+    """
+    parts = urlsplit(image_url.strip())
+    filename = clean_image_url(image_url.strip())
+    stem, extension = os.path.splitext(filename)
+
+    rendition = None
+    match = RENDITION_PATTERN.search(stem)
+    if match:
+        rendition = match.group(0)[1:]
+        stem = stem[:match.start()]
+
+    folder = parts.path.rsplit("/", 1)[0]
+    asset = "%s%s/%s" % (parts.netloc.lower(), folder, stem)
+    return {"asset": asset, "stem": stem, "rendition": rendition, "extension": extension.lower()}
+
+
+def get_asset_key(image_url: str) -> str:
+    return split_image_url(image_url)["asset"]
+
+
+def get_rendition_rank(image_url: str) -> int:
+    """
+    This function returns the position of the rendition of an url in `PREFERRED_RENDITIONS`. Unknown
+    renditions and images without rendition go after the preferred ones.
+    """
+    rendition = split_image_url(image_url)["rendition"]
+    if rendition in PREFERRED_RENDITIONS:
+        return PREFERRED_RENDITIONS.index(rendition)
+    return len(PREFERRED_RENDITIONS)
+
+
+def get_image_name(image_url: str) -> str:
+    """
+    This function builds the file name of an image. It starts with the name of the asset, so it is
+    readable, and ends with a hash of the asset key, so two different images that share a name
+    don't overwrite each other.
+
+    :param image_url: The url of the image
+    :type image_url: str
+    :return: a file name like "18ai-3f2a9c1b.jpg".
+    """
+    parts = split_image_url(image_url)
+    stem = UNSAFE_CHARACTERS.sub("_", parts["stem"])[:MAX_STEM_LENGTH] or "image"
+    digest = hashlib.sha1(parts["asset"].encode("utf-8")).hexdigest()[:8]
+    return "%s-%s%s" % (stem, digest, parts["extension"])
+
+
+class ImageIdentity:
+    def __init__(self):
+        # asset key -> file name of the rendition downloaded for it
+        self.assets = {}
+        self.duplicates = 0
+
+    def add_batch(self, image_urls: list) -> list:
+        """
+        This function assigns a file name to the image of every news of a batch. Renditions of the same
+        asset get the same name and only the preferred rendition of a new asset is downloaded. Assets
+        found in earlier batches keep the rendition chosen then.
+
+        :param image_urls: The image url of every news, "N/A" when it doesn't have image
+        :type image_urls: list
+        :return: a list with the file name of every news ("N/A" without image) and a list with the
+        [name, url] of the new images to download.
+        """
+        best = {}
+        for image_url in image_urls:
+            if image_url == "N/A":
+                continue
+            asset = get_asset_key(image_url)
+            if asset in self.assets:
+                continue
+            if asset not in best or get_rendition_rank(image_url) < get_rendition_rank(best[asset]):
+                best[asset] = image_url
+
+        images_data = []
+        for asset, image_url in best.items():
+            name = get_image_name(image_url)
+            self.assets[asset] = name
+            images_data.append([name, image_url])
+
+        names = []
+        with_image = 0
+        for image_url in image_urls:
+            if image_url == "N/A":
+                names.append("N/A")
+                continue
+            with_image += 1
+            names.append(self.assets[get_asset_key(image_url)])
+
+        self.duplicates += with_image - len(images_data)
+        return [names, images_data]
+
+    def log_summary(self) -> None:
+        """
+        Log the number of assets and the images that were another rendition of them
+        """
+        logging.info(
+            "[images] %s unique images, %s duplicates or other renditions removed"
+            % (len(self.assets), self.duplicates)
+            )
@@ -0,0 +1,198 @@
+import os
+import time
+import sqlite3
+import logging
+from datetime import date
+
+from .dedupe import get_article_key, normalize_key_text
+from .parsing import parse_result_date, format_result_date, RELATIVE_DATE
+from .utils import get_cache_path
+
+
+def get_index_key(title: str, news_date: str) -> str:
+    """
+    This function builds the key of an article in the index. The date is converted to a calendar date
+    first, so "5h ago" today and "Apr. 3" tomorrow produce the same key.
+
+    :param title: The article title
+    :type title: str
+    :param news_date: The article date as shown in the results
+    :type news_date: str
+    :return: a hex hash of the title and date.
+    """
+    parsed = parse_result_date(news_date)
+    return get_article_key(title, parsed.isoformat() if parsed else news_date)
+
+
+def get_published(news_date: str, today: date = None) -> str:
+    """
+    This function converts the date shown in the results into an ISO date, like "2023-04-03".
+
+    :return: the ISO date, or None if the date has an unknown format.
+    """
+    parsed = parse_result_date(news_date, today)
+    return parsed.isoformat() if parsed else None
+
+
+class ArticleIndex:
+    def __init__(self, search: str, path: str = None):
+        """
+        :param search: The search term. Articles are indexed per search, an article known by another
+        search is new for this one
+        :param path: Path of the sqlite file, defaults to ".cache/articles/index.sqlite3"
+        """
+        if path is None:
+            folder = get_cache_path("articles")
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, "index.sqlite3")
+
+        self.search = normalize_key_text(search)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                search TEXT NOT NULL,
+                key TEXT NOT NULL,
+                title TEXT NOT NULL,
+                date TEXT NOT NULL,
+                description TEXT NOT NULL,
+                image TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                published TEXT,
+                PRIMARY KEY (search, key)
+            )
+            """
+            )
+        self.add_published_column()
+        self.connection.commit()
+
+    def add_published_column(self) -> None:
+        """
+        This function adds the publication date to indexes created before it was stored. Relative
+        dates like "5h ago" are converted with the day the article was first seen.
+        """
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(articles)")]
+        if "published" in columns:
+            return
+
+        self.connection.execute("ALTER TABLE articles ADD COLUMN published TEXT")
+        cursor = self.connection.execute("SELECT search, key, date, first_seen FROM articles")
+        self.connection.executemany(
+            "UPDATE articles SET published = ? WHERE search = ? AND key = ?",
+            [
+                [get_published(news_date, date.fromtimestamp(first_seen)), search, key]
+                for search, key, news_date, first_seen in cursor.fetchall()
+                ]
+            )
+
+    def known_keys(self, keys: list) -> set:
+        """
+        This function returns which of the given keys are already in the index.
+        """
+        keys = list(keys)
+        known = set()
+        # sqlite limits the number of parameters of a query
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start+500]
+            placeholders = ",".join("?" * len(batch))
+            cursor = self.connection.execute(
+                "SELECT key FROM articles WHERE search = ? AND key IN (%s)" % placeholders,
+                [self.search] + batch
+                )
+            known.update(row[0] for row in cursor)
+        return known
+
+    def is_known_page(self, rows: list) -> bool:
+        """
+        This function checks if every article of a page of results is already in the index. It is used
+        to stop the pagination.
+
+        :param rows: A list of dictionaries with at least "title" and "date" keys
+        :type rows: list
+        :return: True if the page isn't empty and all its articles are known.
+        """
+        keys = [
+            get_index_key(row["title"], row["date"]) for row in rows
+            if row["title"] is not None and row["date"] is not None
+            ]
+        if len(keys) == 0:
+            return False
+        return len(self.known_keys(keys)) == len(set(keys))
+
+    def add(self, data: list) -> list:
+        """
+        This function stores the scraped articles and returns the ones that weren't known.
+
+        :param data: A list of lists with title, date, description and image
+        :type data: list
+        :return: the articles of `data` seen for the first time, in the same order.
+        """
+        keys = [get_index_key(new[0], new[1]) for new in data]
+        known = self.known_keys(keys)
+        now = time.time()
+
+        new_data = []
+        for new, key in zip(data, keys):
+            if key in known:
+                continue
+            known.add(key)
+            new_data.append(new)
+            self.connection.execute(
+                "INSERT INTO articles "
+                "(search, key, title, date, description, image, first_seen, last_seen, published) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [self.search, key, new[0], new[1], new[2], new[3], now, now, get_published(new[1])]
+                )
+
+        self.connection.executemany(
+            "UPDATE articles SET last_seen = ? WHERE search = ? AND key = ?",
+            [[now, self.search, key] for key in set(keys)]
+            )
+        self.connection.commit()
+
+        logging.info(
+            "[indexing] %s new articles, %s already known"
+            % (len(new_data), len(data) - len(new_data))
+            )
+        return new_data
+
+    def merge(self, data: list, start_date: date = None) -> list:
+        """
+        This function returns the scraped articles and the indexed articles of the search that
+        weren't scraped this time, sorted by publication date, newest first. Articles of the same day
+        keep the order of the results, scraped ones first. Indexed articles shown as "5h ago" when
+        they were stored get the date of that day.
+
+        :param data: A list of lists with title, date, description and image
+        :type data: list
+        :param start_date: Indexed articles published before this date are left out
+        :type start_date: date
+        :return: a list of lists with title, date, description and image.
+        """
+        today = date.today()
+        merged = [[get_published(new[1]), new] for new in data]
+        keys = set(get_index_key(new[0], new[1]) for new in data)
+
+        cursor = self.connection.execute(
+            "SELECT key, title, date, description, image, published FROM articles "
+            "WHERE search = ? ORDER BY first_seen DESC",
+            [self.search]
+            )
+        for key, title, news_date, description, image, published in cursor:
+            if key in keys:
+                continue
+            if start_date is not None and published is not None and \
+                    published < start_date.isoformat():
+                continue
+            if published is not None and RELATIVE_DATE.match(news_date) and \
+                    published != today.isoformat():
+                news_date = format_result_date(date.fromisoformat(published), today)
+            merged.append([published, [title, news_date, description, image]])
+
+        # unknown dates go last
+        merged.sort(key=lambda item: item[0] or "", reverse=True)
+        return [new for _, new in merged]
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# Prefix of the metric names in the Prometheus textfile
+PROMETHEUS_PREFIX = "fresh_news"
+
+
+class Metrics:
+    def __init__(self):
+        self.started_at = datetime.now()
+        # start of the run for its total seconds, the stages don't cover the time between them
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        This context manager measures the time spent in a stage of the pipeline. A stage entered many
+        times accumulates its seconds and calls.
+
+        :param name: The stage name, like "scrape" or "download"
+        :type name: str
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self.lock:
+                stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+                stage["seconds"] += seconds
+                stage["calls"] += 1
+            logging.info("[metrics] %s took %.3fs" % (name, seconds))
+
+    def count(self, name: str, value: int = 1) -> None:
+        """
+        This function adds a value to a counter, like "results" or "download_bytes". It is thread safe.
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def count_chunks(self, name: str, chunks):
+        """
+        This function yields the chunks unchanged while adding their size to a bytes counter.
+        """
+        for chunk in chunks:
+            self.count(name, len(chunk))
+            yield chunk
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {
+                "started_at": self.started_at.isoformat(),
+                "total_seconds": time.perf_counter() - self.started,
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "counters": dict(self.counters)
+                }
+
+    def write_json(self, path: str, extra: dict = None) -> None:
+        """
+        This function writes the metrics to a json file.
+
+        :param path: Path of the json file
+        :type path: str
+        :param extra: Other values to include, like the search or the status of the run
+        :type extra: dict
+        """
+        content = self.to_dict()
+        content.update(extra or {})
+        with open(path, "w") as handler:
+            json.dump(content, handler, indent=2)
+
+    def write_prometheus(self, path: str, labels: dict = None) -> None:
+        """
+        This function writes the metrics in the Prometheus text format, to be collected by the
+        node_exporter textfile collector. The file is replaced atomically.
+
+        :param path: Path of the .prom file
+        :type path: str
+        :param labels: Labels added to every metric, like the search
+        :type labels: dict
+        """
+        content = self.to_dict()
+        base_labels = ",".join(
+            '%s="%s"' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+            for key, value in (labels or {}).items()
+            )
+
+        def format_labels(extra: str) -> str:
+            return "{%s}" % ",".join(label for label in [base_labels, extra] if label)
+
+        lines = [
+            "# HELP %s_stage_seconds Seconds spent in each stage of the pipeline" % PROMETHEUS_PREFIX,
+            "# TYPE %s_stage_seconds gauge" % PROMETHEUS_PREFIX
+            ]
+        for name, stage in content["stages"].items():
+            lines.append("%s_stage_seconds%s %s" % (
+                PROMETHEUS_PREFIX, format_labels('stage="%s"' % name), stage["seconds"]))
+
+        lines.append("# HELP %s_count Items and bytes processed by the pipeline" % PROMETHEUS_PREFIX)
+        lines.append("# TYPE %s_count gauge" % PROMETHEUS_PREFIX)
+        for name, value in content["counters"].items():
+            lines.append("%s_count%s %s" % (
+                PROMETHEUS_PREFIX, format_labels('name="%s"' % name), value))
+
+        lines.append(
+            "# HELP %s_last_run_timestamp_seconds Time the metrics were written" % PROMETHEUS_PREFIX)
+        lines.append("# TYPE %s_last_run_timestamp_seconds gauge" % PROMETHEUS_PREFIX)
+        lines.append("%s_last_run_timestamp_seconds%s %s" % (
+            PROMETHEUS_PREFIX, format_labels(""), time.time()))
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as handler:
+            handler.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+
+# Metrics of the current pipeline run
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def reset_metrics() -> Metrics:
+    """
+    This function starts a new set of metrics, used at the beginning of every pipeline run.
+    """
+    global _metrics
+    _metrics = Metrics()
+    return _metrics
@@ -0,0 +1,316 @@
+import re
+import logging
+from datetime import date, datetime
+from urllib.parse import urljoin
+
+from lxml import html
+
+from .dedupe import Deduplicator, get_article_key
+
+# XPaths of a search result and its fields, relative to the result <li>
+MAIN_XPATH = "//li[@data-testid='search-bodega-result']"
+TITLE_XPATH = ".//h4"
+DATE_XPATH = ".//span[@data-testid='todays-date']"
+IMAGE_XPATH = ".//img[@class='css-rq4mmj']"
+DESCRIPTION_XPATH = ".//p[@class='css-16nhkrn']"
+
+BASE_URL = "https://www.nytimes.com/"
+
+# Formats of the result dates, like "April 3", "Apr. 3" or "Apr. 3, 2022"
+DATE_FORMATS = ["%B %d, %Y", "%b %d, %Y"]
+RELATIVE_DATE = re.compile(r"^\d+\s*[smh]\w*\s+ago$", re.IGNORECASE)
+# Month names of the dates shown in the search results, in the AP style of the site
+MONTH_NAMES = [
+    "Jan.", "Feb.", "March", "April", "May", "June",
+    "July", "Aug.", "Sept.", "Oct.", "Nov.", "Dec."
+    ]
+
+SIZES_WIDTH = re.compile(r"(\d+(?:\.\d+)?)px\s*$")
+
+
+def normalize_text(text: str) -> str:
+    """
+    The function collapses every run of whitespace into a single space, like the rendered text of the
+    element.
+    """
+    return " ".join(text.split())
+
+
+def parse_result_date(text: str, today: date = None) -> date:
+    """
+    This function converts the date shown in a search result into a date.
+
+    :param text: The date text of the result, like "5h ago", "April 3" or "Apr. 3, 2022"
+    :type text: str
+    :param today: Reference date for relative dates and dates without year, defaults to today
+    :type today: date
+    :return: the date of the result, or None if the text doesn't have a known format.
+    """
+    today = today or date.today()
+    text = normalize_text(text)
+
+    # recent results show how long ago they were published
+    if RELATIVE_DATE.match(text):
+        return today
+
+    # "Sept." is the only abbreviation with four letters
+    cleaned = text.replace(".", "").replace("Sept ", "Sep ")
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(cleaned, date_format).date()
+        except ValueError:
+            pass
+
+    # dates of the current year are shown without it. A date after today belongs to last year
+    for year in [today.year, today.year - 1]:
+        for date_format in DATE_FORMATS:
+            try:
+                parsed = datetime.strptime("%s, %s" % (cleaned, year), date_format).date()
+            except ValueError:
+                continue
+            if parsed <= today:
+                return parsed
+
+    return None
+
+
+def format_result_date(value: date, today: date = None) -> str:
+    """
+    This function formats a date like the search results show it: "Sept. 3" in the current year and
+    "Sept. 3, 2022" before.
+    """
+    today = today or date.today()
+    text = "%s %s" % (MONTH_NAMES[value.month - 1], value.day)
+    if value.year != today.year:
+        text += ", %s" % value.year
+    return text
+
+
+def split_srcset(srcset: str) -> list:
+    """
+    This function splits a `srcset` attribute into its candidates with the tokenizer of the HTML
+    spec: the url runs until a whitespace, so it can contain commas, and the descriptors until the
+    next comma. "a.jpg 600w,b.jpg 1200w" and "a.jpg 600w, b.jpg 1200w" are the same.
+
+    :param srcset: The attribute
+    :type srcset: str
+    :return: a list of (url, descriptors) tuples, descriptors is "" when the candidate has none.
+    """
+    text = srcset or ""
+    candidates = []
+    position = 0
+    while True:
+        while position < len(text) and (text[position].isspace() or text[position] == ","):
+            position += 1
+        if position >= len(text):
+            return candidates
+
+        start = position
+        while position < len(text) and not text[position].isspace():
+            position += 1
+        url = text[start:position]
+        if url.endswith(","):
+            candidates.append((url.rstrip(","), ""))
+            continue
+
+        start = position
+        depth = 0
+        while position < len(text) and (text[position] != "," or depth > 0):
+            if text[position] == "(":
+                depth += 1
+            elif text[position] == ")":
+                depth = max(0, depth - 1)
+            position += 1
+        candidates.append((url, text[start:position].strip()))
+
+
+def parse_srcset(srcset: str) -> list:
+    """
+    This function parses the `srcset` attribute of an image.
+
+    :param srcset: The attribute, like "a.jpg 600w, b.jpg 1200w" or "a.jpg 1x, b.jpg 2x"
+    :type srcset: str
+    :return: a list of (url, width, density) tuples, width or density is None when the candidate uses
+    the other descriptor.
+    """
+    candidates = []
+    for url, descriptors in split_srcset(srcset):
+        descriptor = descriptors.split()[0] if descriptors else "1x"
+        try:
+            if descriptor.endswith("w"):
+                candidates.append((url, int(descriptor[:-1]), None))
+            elif descriptor.endswith("x"):
+                candidates.append((url, None, float(descriptor[:-1])))
+        except ValueError:
+            continue
+    return candidates
+
+
+def resolve_srcset(srcset: str, base_url: str) -> str:
+    """
+    This function makes the candidate urls of a `srcset` absolute, like the browser does.
+    """
+    if not srcset:
+        return srcset
+    return ", ".join(
+        " ".join(part for part in [urljoin(base_url, url), descriptors] if part)
+        for url, descriptors in split_srcset(srcset)
+        )
+
+
+def get_sizes_width(sizes: str) -> int:
+    """
+    This function reads the default slot width of the `sizes` attribute of an image, the last entry,
+    like 600 for "(min-width: 1024px) 205px, 600px".
+
+    :return: the width in css pixels, or None when it isn't given in pixels.
+    """
+    if not sizes:
+        return None
+    match = SIZES_WIDTH.search(sizes.split(",")[-1])
+    return int(float(match.group(1))) if match else None
+
+
+def choose_image_url(src: str, srcset: str = None, sizes: str = None, target_width: int = None) -> str:
+    """
+    This function chooses the rendition of an image to download. With width candidates, it is the
+    smallest one at least `target_width` wide, or the widest one when all are smaller. Without target
+    width the slot width of `sizes` is used. With density candidates it is the 1x one.
+
+    :param src: The resolved `src` of the image. Placeholders (data: urls) are ignored
+    :type src: str
+    :param srcset: The `srcset` of the image with absolute urls
+    :type srcset: str
+    :param sizes: The `sizes` of the image
+    :type sizes: str
+    :param target_width: Width in pixels of the images to download
+    :type target_width: int
+    :return: the url of the chosen rendition, `src` when nothing better is found, or None.
+    """
+    if src is not None and src.startswith("data:"):
+        src = None
+
+    candidates = parse_srcset(srcset)
+    if len(candidates) == 0:
+        return src
+
+    width = target_width or get_sizes_width(sizes)
+    widths = [(candidate_width, url) for url, candidate_width, _ in candidates if candidate_width]
+    if width and len(widths) > 0:
+        adequate = [candidate for candidate in widths if candidate[0] >= width]
+        return min(adequate)[1] if len(adequate) > 0 else max(widths)[1]
+
+    densities = [(density, url) for url, _, density in candidates if density]
+    if src is None and len(densities) > 0:
+        return min(densities)[1]
+    return src or candidates[0][0]
+
+
+def build_news_data(
+        rows: list,
+        deduplicator: Deduplicator = None,
+        target_width: int = None
+        ) -> list:
+    """
+    This function converts extracted result fields into the news data rows used by the pipeline.
+
+    :param rows: A list of dictionaries with "title", "date", "description" and "image" keys, and
+    optionally the "srcset" and "sizes" of the image. Missing fields are None
+    :type rows: list
+    :param deduplicator: Optional `Deduplicator` shared between calls, to remove the duplicates of
+    results converted in earlier calls. Its summary is logged by the caller
+    :type deduplicator: Deduplicator
+    :param target_width: Width in pixels used to choose the image rendition, see `choose_image_url`
+    :type target_width: int
+    :return: a list of lists with title, date, description and image, without duplicates (same title
+    and date) in first seen order. Results without title or date are skipped and missing descriptions
+    and images are "N/A".
+    """
+    news_data = []
+    shared = deduplicator is not None
+    if not shared:
+        deduplicator = Deduplicator("articles")
+    for row in rows:
+        if row["title"] is None or row["date"] is None:
+            logging.error("Can't find title or date of a result, skipping it")
+            continue
+
+        row_image = choose_image_url(row["image"], row.get("srcset"), row.get("sizes"), target_width)
+        if row_image is None:
+            logging.error("Can't find element")
+        if row["description"] is None:
+            logging.error("Can't find element")
+
+        description = "N/A" if row["description"] is None else row["description"]
+        image = "N/A" if row_image is None else row_image
+        if deduplicator.is_new(get_article_key(row["title"], row["date"])):
+            news_data.append([row["title"], row["date"], description, image])
+
+    if not shared:
+        deduplicator.log_summary()
+    return news_data
+
+
+def first_text(element, xpath: str) -> str:
+    found = element.xpath(xpath)
+    if len(found) == 0:
+        return None
+    return normalize_text(found[0].text_content())
+
+
+def parse_results(page_source: str, base_url: str = BASE_URL, target_width: int = None) -> list:
+    """
+    This function extracts the search results from a snapshot of the search page html. It doesn't need
+    a browser, so it can run in a worker process or against saved html files.
+
+    :param page_source: The html of the search page, like the one returned by `browser.get_source()`
+    :type page_source: str
+    :param base_url: Url used to resolve relative image urls, like the browser does
+    :type base_url: str
+    :param target_width: Width in pixels used to choose the image rendition from its `srcset`
+    :type target_width: int
+    :return: a list of lists with title, date, description and image, the same rows returned by
+    `scraping.get_data_from_entries`.
+    """
+    document = html.fromstring(page_source)
+
+    rows = []
+    for item in document.xpath(MAIN_XPATH):
+        images = item.xpath(IMAGE_XPATH)
+        image = None
+        srcset = None
+        sizes = None
+        if len(images) > 0:
+            if images[0].get("src") is not None:
+                image = urljoin(base_url, images[0].get("src"))
+            srcset = resolve_srcset(images[0].get("srcset"), base_url)
+            sizes = images[0].get("sizes")
+
+        rows.append({
+            "title": first_text(item, TITLE_XPATH),
+            "date": first_text(item, DATE_XPATH),
+            "description": first_text(item, DESCRIPTION_XPATH),
+            "image": image,
+            "srcset": srcset,
+            "sizes": sizes
+            })
+
+    return build_news_data(rows, target_width=target_width)
+
+
+def parse_results_file(path: str, base_url: str = BASE_URL, target_width: int = None) -> list:
+    """
+    This function extracts the search results from a saved html file.
+
+    :param path: Path of the html file
+    :type path: str
+    :param base_url: Url used to resolve relative image urls
+    :type base_url: str
+    :param target_width: Width in pixels used to choose the image rendition
+    :type target_width: int
+    :return: a list of lists with title, date, description and image.
+    """
+    with open(path, "r", encoding="utf-8") as handler:
+        page_source = handler.read()
+
+    return parse_results(page_source, base_url, target_width)
@@ -0,0 +1,359 @@
+import os
+import logging
+from datetime import datetime
+
+from RPA.Browser.Selenium import Selenium
+
+from .config import RunConfig
+from .filtering import get_search_months
+from .indexing import ArticleIndex
+from .general import open_site
+from .searching import search_news, search_news_by_url
+from .filtering import filter_category_news
+from .scraping import get_news_data, stream_news_data
+from .api_search import get_news_data_from_api
+from .calculations import get_calculated_data
+from .excel import create_file
+from .caching import ImageCache
+from .downloading import ImageDownloader, create_writer, download_images
+from .streaming import StreamingConsumer
+from .checkpoint import Checkpoint
+from .thumbnails import create_thumbnails
+from .metrics import get_metrics, reset_metrics
+from .utils import get_output_path
+
+
+def open_search(browser: Selenium, config: RunConfig) -> None:
+    """
+    This function leaves the browser in the filtered search results, with the search url or through
+    the search form and the filters.
+
+    :param browser: The Selenium instance of the run
+    :type browser: Selenium
+    :param config: The run configuration
+    :type config: RunConfig
+    """
+    metrics = get_metrics()
+    # the search url opens the site, the search and the filters with one navigation
+    searched = False
+    if config.search_mode == "url":
+        with metrics.stage("search"):
+            searched = search_news_by_url(browser, config)
+    if not searched:
+        with metrics.stage("open_site"):
+            open_site(browser, config)
+        with metrics.stage("search"):
+            search_news(browser, config)
+        with metrics.stage("filter"):
+            filter_category_news(browser, config)
+
+
+def get_news(browser: Selenium, config: RunConfig, is_known_page=None) -> list:
+    """
+    This function runs the search with the backend selected in the run configuration. The browser is
+    only used when the HTTP backend isn't selected or fails.
+
+    :param browser: The Selenium instance of the run
+    :type browser: Selenium
+    :param config: The run configuration
+    :type config: RunConfig
+    :param is_known_page: Optional function that stops the pagination when a page has only known
+    results
+    :return: a list of lists with title, date, description and image.
+    """
+    metrics = get_metrics()
+    data = None
+    # the browser search is timed by `open_search`
+    if config.backend == "http":
+        with metrics.stage("search"):
+            data = get_news_data_from_api(config, is_known_page)
+    if data is None:
+        open_search(browser, config)
+        with metrics.stage("scrape"):
+            data = get_news_data(browser, config, is_known_page)
+    metrics.count("results", len(data))
+    return data
+
+
+def stream_news(browser: Selenium, config: RunConfig, on_page) -> None:
+    """
+    This function runs the search like `get_news`, passing every page of results to `on_page` as
+    soon as it is loaded.
+
+    :param browser: The Selenium instance of the run
+    :type browser: Selenium
+    :param config: The run configuration
+    :type config: RunConfig
+    :param on_page: Function that receives a list of dictionaries with "title", "date", "description"
+    and "image" keys
+    """
+    metrics = get_metrics()
+    data = None
+    if config.backend == "http":
+        with metrics.stage("search"):
+            data = get_news_data_from_api(config, on_page=on_page)
+    if data is None:
+        open_search(browser, config)
+        with metrics.stage("scrape"):
+            stream_news_data(browser, on_page, config)
+
+
+def get_news_incremental(browser: Selenium, config: RunConfig) -> list:
+    """
+    This function runs the search stopping at the first page of articles already in the article
+    index, and stores the new ones.
+
+    :param browser: The Selenium instance of the run
+    :type browser: Selenium
+    :param config: The run configuration
+    :type config: RunConfig
+    :return: only the new articles when `config.emit` is "new", or the new articles merged with every
+    indexed article of the search inside the months window when it is "all".
+    """
+    index = ArticleIndex(config.search)
+    try:
+        data = get_news(browser, config, index.is_known_page)
+        new_data = index.add(data)
+        if config.emit == "new":
+            return new_data
+
+        start_date = datetime.strptime(get_search_months(config.months)["start"], "%m/%d/%Y").date()
+        return index.merge(data, start_date)
+    finally:
+        index.close()
+
+
+def get_prometheus_path(path: str, suffix: str = "") -> str:
+    """
+    This function adds the output suffix to the PROMETHEUS_TEXTFILE path, like "nyt_1.prom", so every
+    work item of a batch keeps its own file in the textfile collector directory.
+    """
+    root, extension = os.path.splitext(path)
+    return "%s%s%s" % (root, suffix, extension or ".prom")
+
+
+def write_metrics(config: RunConfig, suffix: str = "", status: str = "done") -> str:
+    """
+    This function writes the metrics of the run to "metrics<suffix>.json" in the output directory.
+    When the PROMETHEUS_TEXTFILE environment variable is set, they are also written in the Prometheus
+    text format to that path with the suffix added. It is called when the run fails too, so errors
+    are logged instead of raised, they would hide the error of the run.
+
+    :param config: The run configuration
+    :type config: RunConfig
+    :param suffix: Text added to the file names
+    :type suffix: str
+    :param status: "done" or "failed"
+    :type status: str
+    :return: the path of the json file, or None if it couldn't be written.
+    """
+    metrics = get_metrics()
+    final_path = os.path.join(get_output_path(), "metrics%s.json" % suffix)
+    try:
+        metrics.write_json(final_path, {"search": config.search, "status": status})
+    except (OSError, ValueError) as e:
+        logging.error("Can't write the metrics file. Reason: %s" % e)
+        final_path = None
+
+    prometheus_path = os.environ.get("PROMETHEUS_TEXTFILE")
+    if prometheus_path:
+        labels = {"search": config.search}
+        if suffix:
+            labels["work_item"] = suffix.lstrip("_")
+        try:
+            metrics.write_prometheus(get_prometheus_path(prometheus_path, suffix), labels)
+        except (OSError, ValueError) as e:
+            logging.error("Can't write the Prometheus metrics. Reason: %s" % e)
+    return final_path
+
+
+def resize_images(config: RunConfig, archive_path: str) -> str:
+    """
+    This function replaces the images of the zip with smaller versions when the "thumbnail_size"
+    option is set.
+
+    :return: the path of the zip file.
+    """
+    if config.thumbnail_size is None or not os.path.exists(archive_path):
+        return archive_path
+    with get_metrics().stage("thumbnails"):
+        return create_thumbnails(
+            archive_path,
+            config.thumbnail_size,
+            config.thumbnail_format,
+            config.thumbnail_quality
+            )
+
+
+def get_checkpoint_paths(checkpoint: Checkpoint = None) -> tuple:
+    """
+    This function returns the image folder and the zip where the images of a run are saved. With a
+    checkpoint both are in its folder, so the images saved by a failed run are kept for its retry.
+    Without one the default paths in the output directory are used.
+
+    :return: a (image_folder, zip_path) tuple, with None for the defaults.
+    """
+    if checkpoint is None:
+        return None, None
+    return checkpoint.images_path, checkpoint.archive_path
+
+
+def run_sequential(
+        browser: Selenium,
+        config: RunConfig,
+        suffix: str = "",
+        checkpoint: Checkpoint = None
+        ) -> dict:
+    """
+    This function runs the stages one after the other: searching, calculations, the results file and
+    the images. With a checkpoint, the scraped and calculated rows are saved when their stage ends,
+    a stage saved by a previous run isn't run again and the images already downloaded are kept.
+
+    :return: a dictionary with the number of "results" and "images" and the output "files".
+    """
+    metrics = get_metrics()
+    calculated = checkpoint.load("calculated") if checkpoint is not None else None
+    if calculated is None:
+        data = checkpoint.load("scraped") if checkpoint is not None else None
+        if data is None:
+            if config.incremental:
+                data = get_news_incremental(browser, config)
+            else:
+                data = get_news(browser, config)
+            if checkpoint is not None:
+                checkpoint.save("scraped", data)
+
+        with metrics.stage("calculations"):
+            calculated = get_calculated_data(data, config)
+        if checkpoint is not None:
+            checkpoint.save("calculated", calculated)
+    data_with_extra_info, images_data = calculated
+
+    with metrics.stage("excel"):
+        results_path = create_file(data_with_extra_info, config, suffix)
+    image_folder, zip_path = get_checkpoint_paths(checkpoint)
+    archive_path = download_images(
+        images_data,
+        workers=config.download_workers,
+        stream_to_zip=config.stream_images,
+        use_cache=config.use_cache,
+        archive_name="images" + suffix,
+        image_folder=image_folder,
+        zip_path=zip_path
+        )
+
+    archive_path = resize_images(config, archive_path)
+
+    return {
+        "results": len(data_with_extra_info),
+        "images": len(images_data),
+        "files": [results_path, archive_path]
+        }
+
+
+def run_streaming(
+        browser: Selenium,
+        config: RunConfig,
+        suffix: str = "",
+        checkpoint: Checkpoint = None
+        ) -> dict:
+    """
+    This function runs the calculations and the image downloads while the results are scraped. Every
+    page of results goes through a bounded queue to a consumer thread that adds the calculated
+    columns and sends the images to the download workers. The results file is written and the images
+    that failed are retried once the scraping ends. With a checkpoint, the calculated rows are saved
+    when the scraping ends, and a run whose scraping ended before continues like `run_sequential`.
+
+    :return: a dictionary with the number of "results" and "images" and the output "files".
+    """
+    if checkpoint is not None and checkpoint.has("calculated"):
+        return run_sequential(browser, config, suffix, checkpoint)
+
+    metrics = get_metrics()
+    archive_name = "images" + suffix
+    image_folder, zip_path = get_checkpoint_paths(checkpoint)
+    writer = create_writer(config.stream_images, archive_name, image_folder, zip_path)
+    try:
+        cache = ImageCache() if config.use_cache else None
+        downloader = ImageDownloader(config.download_workers, cache=cache)
+        consumer = StreamingConsumer(config, writer, downloader).start()
+        try:
+            with metrics.stage("stream"):
+                try:
+                    stream_news(browser, config, consumer.put)
+                finally:
+                    data_with_extra_info, images_data = consumer.finish()
+        finally:
+            downloader.close()
+            if cache is not None:
+                cache.close()
+        if consumer.error is not None:
+            raise consumer.error
+        metrics.count("results", len(data_with_extra_info))
+        if checkpoint is not None:
+            checkpoint.save("calculated", [data_with_extra_info, images_data])
+
+        with metrics.stage("excel"):
+            results_path = create_file(data_with_extra_info, config, suffix)
+    except BaseException:
+        writer.close()
+        raise
+
+    # only the images that failed while streaming are downloaded, then the zip is finished
+    archive_path = download_images(
+        images_data,
+        workers=config.download_workers,
+        stream_to_zip=config.stream_images,
+        use_cache=config.use_cache,
+        archive_name=archive_name,
+        writer=writer,
+        image_folder=image_folder,
+        zip_path=zip_path
+        )
+
+    archive_path = resize_images(config, archive_path)
+
+    return {
+        "results": len(data_with_extra_info),
+        "images": len(images_data),
+        "files": [results_path, archive_path]
+        }
+
+
+def run_pipeline(browser: Selenium, config: RunConfig, suffix: str = "") -> dict:
+    """
+    This function runs every stage for a search: searching, calculations, the results file and the
+    images zip. With the "streaming" option the calculations and the downloads run while the results
+    are scraped, incremental runs are always sequential because they need every result to update the
+    article index. With the "resume" option (the default) a run that failed continues from its last
+    completed stage when it is run again with the same work item. The time of every stage and the
+    items and bytes processed are written to the metrics file, even when a stage fails.
+
+    :param browser: The Selenium instance of the run
+    :type browser: Selenium
+    :param config: The run configuration
+    :type config: RunConfig
+    :param suffix: Text added to the output file names, to keep the files of every search apart
+    :type suffix: str
+    :return: a dictionary with the number of "results" and "images" and the output "files".
+    """
+    logging.info("Starting [pipeline][run_pipeline]")
+    metrics = reset_metrics()
+    status = "failed"
+    checkpoint = Checkpoint(config, suffix) if config.resume else None
+    try:
+        if config.streaming and not config.incremental:
+            result = run_streaming(browser, config, suffix, checkpoint)
+        else:
+            result = run_sequential(browser, config, suffix, checkpoint)
+        metrics.count("rows", result["results"])
+        metrics.count("images", result["images"])
+        metrics.count("results_file_bytes", os.path.getsize(result["files"][0]))
+        status = "done"
+        if checkpoint is not None:
+            checkpoint.clear()
+    finally:
+        write_metrics(config, suffix, status)
+    logging.info("Ending [pipeline][run_pipeline]")
+
+    return result
@@ -5,63 +5,255 @@ from RPA.Browser.Selenium import Selenium
 
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import (
     ElementClickInterceptedException,
     StaleElementReferenceException,
-    NoSuchElementException)
+    NoSuchElementException,
+    TimeoutException,
+    WebDriverException)
 
 import logging
+from datetime import date, datetime
 
-def get_all_results(browser: Selenium) -> None:
+from .parsing import (
+    MAIN_XPATH,
+    TITLE_XPATH,
+    DATE_XPATH,
+    IMAGE_XPATH,
+    DESCRIPTION_XPATH,
+    build_news_data,
+    choose_image_url,
+    resolve_srcset,
+    parse_results,
+    parse_result_date,
+    normalize_text)
+from .filtering import get_search_months
+from .config import RunConfig, get_config
+from .dedupe import Deduplicator, get_article_key
+
+SHOW_MORE_BUTTON = "//button[@data-testid='search-show-more-button']"
+# Seconds to wait for new results after clicking "show more"
+PAGE_TIMEOUT = 10
+# Clicks in a row that can end without new results, or in another url, before giving up
+MAX_FAILED_PAGES = 3
+
+# Reads every result in a single WebDriver call. It uses the same XPaths as the element by element
+# path, the rendered text like `get_text` and the resolved `src` property like `get_element_attribute`.
+# Text whitespace is collapsed the same way `parsing.parse_results` does it. The `srcset` is returned
+# as it is with the base url of the page, `parsing.resolve_srcset` tokenizes and resolves it
+EXTRACT_RESULTS_SCRIPT = r"""
+const [mainXpath, titleXpath, dateXpath, imageXpath, descriptionXpath, start] = arguments;
+const first = (node, xpath) => document.evaluate(
+    xpath, node, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const text = (element) => element ? element.innerText.replace(/\s+/g, " ").trim() : null;
+const items = document.evaluate(
+    mainXpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const rows = [];
+for (let i = start || 0; i < items.snapshotLength; i++) {
+    const item = items.snapshotItem(i);
+    const image = first(item, imageXpath);
+    rows.push({
+        title: text(first(item, titleXpath)),
+        date: text(first(item, dateXpath)),
+        description: text(first(item, descriptionXpath)),
+        image: image && image.getAttribute("src") !== null ? image.src : null,
+        srcset: image ? image.getAttribute("srcset") : null,
+        sizes: image ? image.getAttribute("sizes") : null
+    });
+}
+return [document.baseURI, rows];
+"""
+
+def get_oldest_result_date(browser: Selenium) -> date:
+    """
+    This function reads the date of the last loaded result. Results are sorted by newest, so it is the
+    oldest one.
+
+    :param browser: The browser object that is being used to interact with a web page
+    :type browser: Selenium
+    :return: the date of the last result, or None if it can't be read.
+    """
+    last_date_xpath = "(%s)[last()]%s" % (MAIN_XPATH, DATE_XPATH[1:])
+    try:
+        text = browser.get_text(last_date_xpath)
+    except (ElementNotFound, WebDriverException):
+        return None
+    return parse_result_date(text)
+
+def click_show_more(browser: Selenium) -> None:
+    """
+    This function clicks the "show more" button. If another element would receive the click, the
+    click is sent through javascript.
+
+    :param browser: The browser object that is being used to interact with a web page
+    :type browser: Selenium
+    """
+    button = browser.find_element(SHOW_MORE_BUTTON)
+    try:
+        button.click()
+    except ElementClickInterceptedException:
+        browser.driver.execute_script("arguments[0].click();", button)
+
+def wait_for_more_results(browser: Selenium, current_count: int, timeout: int) -> int:
+    """
+    This function waits until the page has more results than `current_count`.
+
+    :param browser: The browser object that is being used to interact with a web page
+    :type browser: Selenium
+    :param current_count: Number of results before clicking "show more"
+    :type current_count: int
+    :param timeout: Maximum seconds to wait
+    :type timeout: int
+    :return: the new number of results.
+    :raises TimeoutException: if the results don't grow before the timeout.
+    """
+    def more_results(driver):
+        count = len(driver.find_elements(By.XPATH, MAIN_XPATH))
+        return count if count > current_count else False
+
+    wait = WebDriverWait(browser.driver, timeout, poll_frequency=0.25)
+    return wait.until(more_results)
+
+def get_result_fields(browser: Selenium, start: int = 0) -> list:
+    """
+    This function reads the fields of the loaded results with a single script execution.
+
+    :param browser: The browser object that is being used to interact with a web page
+    :type browser: Selenium
+    :param start: Position of the first result to read, to read only the results of the last page
+    :type start: int
+    :return: a list of dictionaries with "title", "date", "description" and "image" keys, None when
+    the field isn't found.
+    """
+    base_url, rows = browser.driver.execute_script(
+        EXTRACT_RESULTS_SCRIPT,
+        MAIN_XPATH,
+        TITLE_XPATH,
+        DATE_XPATH,
+        IMAGE_XPATH,
+        DESCRIPTION_XPATH,
+        start
+        )
+    for row in rows:
+        if row["srcset"]:
+            row["srcset"] = resolve_srcset(row["srcset"], base_url)
+    return rows
+
+def get_all_results(
+        browser: Selenium,
+        max_results: int = None,
+        start_date: date = None,
+        timeout: int = PAGE_TIMEOUT,
+        is_known_page=None,
+        on_page=None
+        ) -> int:
     """
-    The function clicks on a "show more" button on a webpage until the button is no longer present.
+    The function clicks on the "show more" button and waits for the new results until the button is no
+    longer present, `max_results` results are loaded, the oldest result is before `start_date` or a
+    page has only known results.
 
     :param browser: The browser object that is being used to interact with a web page
+    :type browser: Selenium
+    :param max_results: Stop once this number of results is loaded. None loads every result
+    :type max_results: int
+    :param start_date: Stop once the oldest loaded result was published before this date
+    :type start_date: date
+    :param timeout: Maximum seconds to wait for new results after each click
+    :type timeout: int
+    :param is_known_page: Optional function that receives the fields of the results of the last page
+    (see `get_result_fields`) and returns True when all of them were scraped before
+    :param on_page: Optional function that receives the fields of the results as soon as they are
+    loaded, every result is passed once
+    :return: the number of loaded results.
     """
-    show_more_button = "//button[@data-testid='search-show-more-button']"
-    main_xpath = "//li[@data-testid='search-bodega-result']"
-    counter = 1
-    condition = True
     url = browser.get_location()
-    current_news = 0
-    while condition:
+    news_qty = browser.get_element_count(MAIN_XPATH)
+    # position of the first result of the last loaded page
+    page_start = 0
+    failed_pages = 0
+    pages = 1
+    # number of results already passed to `on_page`
+    emitted = 0
+
+    def emit_new_results() -> int:
+        # nothing is read while fewer results than `emitted` are loaded
+        page_fields = get_result_fields(browser, emitted)
+        if len(page_fields) > 0:
+            on_page(page_fields)
+        return emitted + len(page_fields)
+
+    while True:
+        if on_page is not None:
+            emitted = emit_new_results()
+
+        if is_known_page is not None and is_known_page(get_result_fields(browser, page_start)):
+            logging.info("Every result of page %s was scraped before" % pages)
+            break
+
+        if max_results is not None and news_qty >= max_results:
+            logging.info("Loaded %s results, the limit is %s" % (news_qty, max_results))
+            break
+
+        if start_date is not None and news_qty > 0:
+            oldest = get_oldest_result_date(browser)
+            if oldest is not None and oldest < start_date:
+                logging.info("Oldest result is from %s, before %s" % (oldest, start_date))
+                break
+
         try:
-            news_qty = browser.get_element_count(main_xpath)
             browser.location_should_be(url)
-            browser.page_should_contain_element(show_more_button)
-
-            #Prevents unnecesary cliks
-            if news_qty != current_news:
-                browser.wait_until_element_is_visible(show_more_button)
-                counter = counter+1
-                current_news = news_qty
-            else:
-                current_news = current_news + 1
-                continue
+            browser.page_should_contain_element(SHOW_MORE_BUTTON)
+            click_show_more(browser)
+            page_start = news_qty
+            news_qty = wait_for_more_results(browser, news_qty, timeout)
+            failed_pages = 0
+            pages = pages+1
         except AssertionError as e:
             if "Location should have been" in repr(e):
-                logging.error("Incorrect url, reloading page")
+                # a page that keeps redirecting would loop forever
+                failed_pages = failed_pages+1
+                logging.error(
+                    "Incorrect url, going back to the results (%s/%s)"
+                    % (failed_pages, MAX_FAILED_PAGES)
+                    )
                 browser.go_back()
-                counter = 1
+                # the results page may come back with fewer results. The ones already passed to
+                # `on_page` are kept, the next ones are passed once "show more" loads past them
+                news_qty = browser.get_element_count(MAIN_XPATH)
+                page_start = min(page_start, news_qty)
+                if failed_pages == MAX_FAILED_PAGES:
+                    break
             else:
-                logging.error("Page doesn't have show more button")
-                condition = False
-        except ElementClickInterceptedException as e:
-            logging.error("Element 'show_more_button' is not clickable. Other element would receive the click.")
-            logging.error("Restart process")
-            browser.reload_page()
-            counter = 1
-            current_news = 0
-        except StaleElementReferenceException:
-            logging.error("For some reason the element was marked as invalid and we should restart this process.")
-            browser.reload_page()
-            counter = 1
-        except ElementNotFound:
-            logging.error("Sometimes the element can't be found after the iterations")
-            browser.reload_page()
-
-
-def get_new_image(browser: Selenium, new: WebElement) -> dict:
+                logging.info("Page doesn't have show more button")
+                break
+        except TimeoutException:
+            failed_pages = failed_pages+1
+            logging.error(
+                "No new results after %s seconds (%s/%s)"
+                % (timeout, failed_pages, MAX_FAILED_PAGES)
+                )
+            if failed_pages == MAX_FAILED_PAGES:
+                break
+        except (StaleElementReferenceException, ElementNotFound):
+            # the button was re-rendered between finding and clicking it, try again
+            failed_pages = failed_pages+1
+            if failed_pages == MAX_FAILED_PAGES:
+                break
+
+    # results that arrived after the last wait timed out
+    if on_page is not None:
+        emit_new_results()
+
+    logging.info("Loaded %s results in %s pages" % (news_qty, pages))
+    return news_qty
+
+def get_new_image(
+        browser: Selenium,
+        new: WebElement,
+        target_width: int = None,
+        base_url: str = None
+        ) -> dict:
     """
     This function takes a Selenium browser and an image element, attempts to retrieve the image source
     attribute, and returns a dictionary with the image source and a boolean indicating whether the image
@@ -73,13 +265,23 @@ def get_new_image(browser: Selenium, new: WebElement) -> dict:
     case, the image_element parameter is a WebElement object that represents an image element on a web
     page. It is used to extract the source URL of the image
     :type image_element: WebElement
+    :param target_width: Width in pixels used to choose the rendition from the `srcset`, see
+    `parsing.choose_image_url`
+    :type target_width: int
+    :param base_url: Url of the page, used to resolve relative `srcset` urls
+    :type base_url: str
     :return: A dictionary containing the image source and a boolean indicating whether the image was
     found or not.
     """
     image_found = False
     try:
-        image_element = new.find_element(By.XPATH, ".//img[@class='css-rq4mmj']")
+        image_element = new.find_element(By.XPATH, IMAGE_XPATH)
         image = browser.get_element_attribute(image_element, "src")
+        srcset = browser.get_element_attribute(image_element, "srcset")
+        if srcset and base_url:
+            srcset = resolve_srcset(srcset, base_url)
+        sizes = browser.get_element_attribute(image_element, "sizes")
+        image = choose_image_url(image, srcset, sizes, target_width) or "N/A"
         image_found = True
     except NoSuchElementException as e:
         logging.error("Can't find element")
@@ -104,7 +306,7 @@ def get_new_description(browser: Selenium, new: WebElement) -> dict:
     """
     description_found = False
     try:
-        description_element = new.find_element(By.XPATH, ".//p[@class='css-16nhkrn']")
+        description_element = new.find_element(By.XPATH, DESCRIPTION_XPATH)
         description = browser.get_text(description_element)
         description_found = True
     except NoSuchElementException as e:
@@ -113,42 +315,111 @@ def get_new_description(browser: Selenium, new: WebElement) -> dict:
     return {"description": description, "found":description_found}
 
 
-def get_data_from_entries(browser: Selenium) -> list:
+def get_data_from_entries_by_element(browser: Selenium, target_width: int = None) -> list:
     """
-    This function extracts data from a webpage using XPaths and returns a list of news data.
+    This function extracts data from a webpage using XPaths and returns a list of news data. Every
+    field is read with its own WebDriver call, it is used when the bulk script can't run.
 
     :param browser: The browser object is an instance of a web driver that allows the script to interact
     with a web page
-    :param search: The search parameter is a string that represents the search query that will be used
-    to search for news articles on a website
+    :param target_width: Width in pixels used to choose the image rendition
     :return: a list of lists containing the title, date, and description of news articles obtained from
     a web page using XPaths.
     """
-    main_xpath = "//li[@data-testid='search-bodega-result']"
-    descriptions_xpath = '//li[@data-testid="search-bodega-result"]//p[@class="css-16nhkrn"]'
-    images_xpath = "//li[@data-testid='search-bodega-result']//img"
-
-    news_count = browser.get_element_count(main_xpath)
-    news = browser.get_webelements(main_xpath)
+    news_count = browser.get_element_count(MAIN_XPATH)
+    news = browser.get_webelements(MAIN_XPATH)
+    base_url = browser.get_location()
 
     news_data = []
+    deduplicator = Deduplicator("articles")
     for new in range(news_count):
         current_new = news[new]
 
-        title_element = current_new.find_element(By.XPATH, ".//h4")
-        date_element = current_new.find_element(By.XPATH, ".//span[@data-testid='todays-date']")
+        title_element = current_new.find_element(By.XPATH, TITLE_XPATH)
+        date_element = current_new.find_element(By.XPATH, DATE_XPATH)
 
-        image = get_new_image(browser, current_new)
+        image = get_new_image(browser, current_new, target_width, base_url)
         description = get_new_description(browser, current_new)
-        title = browser.get_text(title_element)
-        date = browser.get_text(date_element)
-        new_data = [title, date, description["description"], image["image"]]
-        if new_data not in news_data:
-            news_data.append([title, date, description["description"], image["image"]])
+        # normalized like the bulk script and the page source paths, so the rows are identical
+        title = normalize_text(browser.get_text(title_element))
+        date = normalize_text(browser.get_text(date_element))
+        if deduplicator.is_new(get_article_key(title, date)):
+            news_data.append(
+                [title, date, normalize_text(description["description"]), image["image"]])
 
+    deduplicator.log_summary()
     return news_data
 
-def get_news_data(browser: Selenium) -> list:
+def get_data_from_entries_bulk(browser: Selenium, target_width: int = None) -> list:
+    """
+    This function extracts the title, date, description and image of every result with a single
+    script execution, instead of several WebDriver calls per result.
+
+    :param browser: The browser object is an instance of a web driver that allows the script to interact
+    with a web page
+    :type browser: Selenium
+    :param target_width: Width in pixels used to choose the image rendition
+    :type target_width: int
+    :return: a list of lists containing the title, date, description and image of the news articles.
+    Missing descriptions and images are "N/A", like in `get_new_description` and `get_new_image`.
+    """
+    rows = get_result_fields(browser)
+
+    return build_news_data(rows, target_width=target_width)
+
+def get_data_from_page_source(browser: Selenium, target_width: int = None) -> list:
+    """
+    This function takes a single snapshot of the page html and parses the results without any other
+    WebDriver call.
+
+    :param browser: The browser object is an instance of a web driver that allows the script to interact
+    with a web page
+    :type browser: Selenium
+    :param target_width: Width in pixels used to choose the image rendition
+    :type target_width: int
+    :return: a list of lists containing the title, date, description and image of the news articles.
+    """
+    page_source = browser.get_source()
+    return parse_results(page_source, browser.get_location(), target_width)
+
+def get_data_from_entries(browser: Selenium, target_width: int = None) -> list:
+    """
+    This function extracts data from a webpage and returns a list of news data. It reads every result
+    in one script execution and falls back to reading element by element if the script fails.
+
+    :param browser: The browser object is an instance of a web driver that allows the script to interact
+    with a web page
+    :param target_width: Width in pixels used to choose the image rendition, None uses the slot width
+    of the image `sizes`
+    :return: a list of lists containing the title, date, description and image of news articles.
+    """
+    try:
+        return get_data_from_entries_bulk(browser, target_width)
+    except WebDriverException as e:
+        logging.error("Bulk extraction failed, reading results one by one. Reason: %s" % e)
+        return get_data_from_entries_by_element(browser, target_width)
+
+def stream_news_data(browser: Selenium, on_page, config: RunConfig = None) -> int:
+    """
+    This function loads every result like `get_news_data`, but passes the fields of the results to
+    `on_page` as soon as every page is loaded instead of extracting them at the end.
+
+    :param browser: The Selenium instance of the run
+    :type browser: Selenium
+    :param on_page: Function that receives a list of dictionaries with "title", "date", "description"
+    and "image" keys, see `get_result_fields`
+    :param config: The run configuration, defaults to the loaded one
+    :type config: RunConfig
+    :return: the number of loaded results.
+    """
+    logging.info("Starting [scraping][stream_news_data]")
+    config = config or get_config()
+    start_date = datetime.strptime(get_search_months(config.months)["start"], "%m/%d/%Y").date()
+    news_qty = get_all_results(browser, config.max_results, start_date, on_page=on_page)
+    logging.info("Ending [scraping][stream_news_data]")
+    return news_qty
+
+def get_news_data(browser: Selenium, config: RunConfig = None, is_known_page=None) -> list:
     """
     This function expands all news and retrieves data including title, date, description, and image from
     entries using a Selenium browser.
@@ -157,16 +428,26 @@ def get_news_data(browser: Selenium) -> list:
     to automate the web browser. It is passed as an argument to the function "get_news_data" so that the
     function can interact with the web page and extract the necessary data
     :type browser: Selenium
+    :param config: The run configuration with the months to search and the maximum number of news
+    to retrieve, defaults to the loaded one
+    :type config: RunConfig
+    :param is_known_page: Optional function that stops the pagination when a page has only known
+    results, see `get_all_results`
     :return: The function `get_news_data` returns a list of news data, where each news item is
     represented as a list containing the following information: title, date, description, and image.
     """
 
     logging.info("Starting [scraping][get_news_data]")
-    get_all_results(browser)
+    config = config or get_config()
+    max_results = config.max_results
+    start_date = datetime.strptime(get_search_months(config.months)["start"], "%m/%d/%Y").date()
+    get_all_results(browser, max_results, start_date, is_known_page=is_known_page)
 
     # data information contains
     # 0 title | 1 date | 2 description | 3 image
-    data = get_data_from_entries(browser)
+    data = get_data_from_entries(browser, config.image_width)
+    if max_results is not None:
+        data = data[:max_results]
 
-    logging.info("Starting [scraping][get_news_data]")
+    logging.info("Ending [scraping][get_news_data]")
     return data
\ No newline at end of file
@@ -1,20 +1,36 @@
-from .utils import get_variable, accept_cookies
+from .config import RunConfig, get_config
+from .utils import accept_cookies
+from .general import open_site
+from .parsing import MAIN_XPATH
+from .filtering import get_search_months, load_cached_facets, determine_type_or_section
 from RPA.Browser.Selenium import Selenium
+from datetime import datetime
+from urllib.parse import urlencode
 import logging
+import re
 
-def search_news(browser: Selenium) -> None:
+SEARCH_URL = "https://www.nytimes.com/search"
+# Seconds to wait for the results of the search url
+RESULTS_TIMEOUT = 10
+# Url parameter of every kind of filter
+FILTER_PARAMS = {"section": "sections", "type": "types"}
+# Line above the results with their number, like "Showing 1,234 results for:"
+RESULTS_STATUS_XPATH = "//p[@data-testid='SearchForm-status']"
+RESULTS_COUNT = re.compile(r"Showing\s+([\d,]+)\s+results?", re.IGNORECASE)
+
+def search_news(browser: Selenium, config: RunConfig = None) -> None:
     """
     This function searches for news articles using a web browser and a search term.
 
     :param browser: The web browser object that is being used to interact with the webpage
-    :param term: The search term that the function will use to search for news articles
+    :param config: The run configuration with the search term, defaults to the loaded one
     """
     logging.info("Starting [searching][search_news]")
 
     accept_cookies(browser)
 
     # Variables
-    term = get_variable("search")
+    term = (config or get_config()).search
     search_button = '//button[contains(@class, "css-tkwi90")]'
     search_input = '//input[@data-testid="search-input"]'
     search_submit = '//button[@data-test-id="search-submit"]'
@@ -24,4 +40,96 @@ def search_news(browser: Selenium) -> None:
     browser.input_text_when_element_is_visible(search_input, term)
     browser.click_element_when_visible(search_submit)
 
-    logging.info("Ending [searching][search_news]")
\ No newline at end of file
+    logging.info("Ending [searching][search_news]")
+
+
+def build_search_url(config: RunConfig, facets: dict = None) -> str:
+    """
+    This function builds the url of the search results with the term, the `get_search_months` date
+    range, newest first and the selected sections or types, the same state the search form and the
+    filters leave.
+
+    :param config: The run configuration
+    :type config: RunConfig
+    :param facets: The sections and types with their url values, see `filtering.get_facets`
+    :type facets: dict
+    :return: the search url, or None when a selection isn't in the saved sections and types or its url
+    value isn't known, then the filters have to be clicked.
+    """
+    date_ranges = get_search_months(config.months)
+    params = {
+        "query": config.search,
+        "sort": "newest",
+        "startDate": datetime.strptime(date_ranges["start"], "%m/%d/%Y").strftime("%Y%m%d"),
+        "endDate": datetime.strptime(date_ranges["end"], "%m/%d/%Y").strftime("%Y%m%d")
+        }
+
+    selections = config.category_or_section or ["Any"]
+    if selections != ["Any"]:
+        if facets is None:
+            return None
+        if not set(selections).issubset(set(facets["section"]).union(facets["type"])):
+            return None
+
+        type_or_section = determine_type_or_section(facets["section"], facets["type"], selections)
+        values = facets["values"].get(type_or_section, {})
+        # like `generic_apply_filter`, only the selections of the chosen kind are applied
+        found_items = [item for item in selections if item in facets[type_or_section]]
+        if not all(item in values for item in found_items):
+            return None
+        if len(found_items) > 0:
+            params[FILTER_PARAMS[type_or_section]] = ",".join(values[item] for item in found_items)
+
+    return "%s?%s" % (SEARCH_URL, urlencode(params))
+
+
+def get_results_count(browser: Selenium) -> int:
+    """
+    This function reads the number of results of the search from the status line above them.
+
+    :param browser: The web browser object that is being used to interact with the webpage
+    :return: the number of results, or None if the status line isn't shown or has another format.
+    """
+    if browser.get_element_count(RESULTS_STATUS_XPATH) == 0:
+        return None
+    match = RESULTS_COUNT.search(browser.get_text(RESULTS_STATUS_XPATH))
+    if match is None:
+        return None
+    return int(match.group(1).replace(",", ""))
+
+
+def search_news_by_url(browser: Selenium, config: RunConfig = None) -> bool:
+    """
+    This function opens the filtered search results with a single navigation, instead of typing the
+    term and clicking the date range, the sort and the filters.
+
+    :param browser: The web browser object that is being used to interact with the webpage
+    :param config: The run configuration, defaults to the loaded one
+    :return: True if the results were opened, also when the search has no results, False if the
+    search has to be done through the search form and `filtering.filter_category_news`.
+    """
+    logging.info("Starting [searching][search_news_by_url]")
+    config = config or get_config()
+    facets = load_cached_facets() if config.use_cache else None
+    url = build_search_url(config, facets)
+    if url is None:
+        logging.info("The url of the filters isn't known, using the search form")
+        return False
+
+    open_site(browser, config, url)
+    accept_cookies(browser)
+    try:
+        # a search without results only shows the status line
+        browser.wait_until_page_contains_element(
+            "%s | %s" % (MAIN_XPATH, RESULTS_STATUS_XPATH), RESULTS_TIMEOUT)
+        if get_results_count(browser) == 0 and browser.get_element_count(MAIN_XPATH) == 0:
+            logging.info("The search has no results")
+            logging.info("Ending [searching][search_news_by_url]")
+            return True
+        browser.wait_until_page_contains_element(MAIN_XPATH, RESULTS_TIMEOUT)
+    except AssertionError:
+        logging.error("The search url didn't show results, using the search form")
+        return False
+
+    logging.info("Ending [searching][search_news_by_url]")
+    return True
@@ -0,0 +1,112 @@
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import RunConfig
+from .dedupe import Deduplicator
+from .parsing import build_news_data
+from .calculations import calculate_news
+from .images import ImageIdentity
+from .downloading import ImageDownloader
+from .metrics import get_metrics
+
+# Pages of results waiting for the consumer. When it is full the scraper waits, so a slow consumer
+# doesn't make the memory grow
+QUEUE_SIZE = 16
+
+
+class StreamingConsumer:
+    def __init__(
+        self,
+        config: RunConfig,
+        writer,
+        downloader: ImageDownloader,
+        queue_size: int = QUEUE_SIZE
+    ):
+        """
+        :param config: The run configuration with the search and the maximum number of results
+        :param writer: `FolderWriter` or `ZipWriter` where the images are saved
+        :param downloader: The `ImageDownloader` used by the download workers
+        :param queue_size: Pages of results that can wait for the consumer
+        """
+        self.config = config
+        self.writer = writer
+        self.downloader = downloader
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.articles = Deduplicator("articles")
+        self.images = ImageIdentity()
+        self.results = []
+        self.images_data = []
+        self.futures = []
+        self.error = None
+        self.executor = ThreadPoolExecutor(max_workers=downloader.workers)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.finished = False
+
+    def start(self) -> "StreamingConsumer":
+        self.thread.start()
+        return self
+
+    def put(self, rows: list) -> None:
+        """
+        This function sends a page of results to the consumer. It waits while the queue is full.
+
+        :param rows: A list of dictionaries with "title", "date", "description" and "image" keys
+        :type rows: list
+        """
+        if self.error is None:
+            self.queue.put(list(rows))
+
+    def run(self) -> None:
+        while True:
+            rows = self.queue.get()
+            if rows is None:
+                break
+            # after an error the pages are only drained, so the scraper never waits forever
+            if self.error is not None:
+                continue
+            try:
+                self.process(rows)
+            except Exception as e:
+                logging.error("Streaming consumer failed. Reason: %s" % e)
+                self.error = e
+
+    def process(self, rows: list) -> None:
+        """
+        This function converts a page of results, adds the calculated columns and sends the new images
+        to the download workers.
+        """
+        with get_metrics().stage("calculations"):
+            news = build_news_data(rows, self.articles, self.config.image_width)
+            max_results = self.config.max_results
+            if max_results is not None:
+                news = news[:max(0, max_results - len(self.results))]
+            data_with_extra_info, images_data = calculate_news(news, self.config.search, self.images)
+
+        self.results.extend(data_with_extra_info)
+        self.images_data.extend(images_data)
+        for row in images_data:
+            self.futures.append(self.executor.submit(self.downloader.fetch, row, self.writer))
+
+    def finish(self) -> list:
+        """
+        This function waits until every page is processed and every image download ends. It can be
+        called more than once.
+
+        :return: a list with the rows of the results file and the [name, url] of the images, like
+        `calculations.get_calculated_data`.
+        """
+        if not self.finished:
+            self.finished = True
+            self.queue.put(None)
+            self.thread.join()
+            self.executor.shutdown(wait=True)
+            saved = sum(1 for future in self.futures if future.result())
+            self.articles.log_summary()
+            self.images.log_summary()
+            logging.info(
+                "[streaming] %s results, %s of %s images saved while scraping"
+                % (len(self.results), saved, len(self.images_data))
+                )
+        return [self.results, self.images_data]
@@ -0,0 +1,183 @@
+import io
+import os
+import json
+import logging
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from .downloading import DUPLICATES_FILE
+from .metrics import get_metrics
+
+THUMBNAIL_FORMATS = {"jpeg": ".jpg", "webp": ".webp"}
+DEFAULT_QUALITY = 80
+MANIFEST_FILE = "manifest.json"
+# Images sent to every worker at the same time, so only a few images are in memory
+IMAGES_PER_WORKER = 4
+
+
+def make_thumbnail(content: bytes, max_dimension: int, image_format: str, quality: int) -> dict:
+    """
+    This function resizes an image so its largest side is at most `max_dimension` pixels and encodes
+    it again. It runs in the worker processes.
+
+    :param content: The original image
+    :type content: bytes
+    :param max_dimension: Maximum width and height in pixels
+    :type max_dimension: int
+    :param image_format: "jpeg" or "webp"
+    :type image_format: str
+    :param quality: Encoder quality, from 1 to 95
+    :type quality: int
+    :return: a dictionary with the derived "content" and the original and derived sizes, or with an
+    "error" when the image can't be decoded.
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            original_size = image.size
+            # JPEG images are decoded directly at a reduced scale, much faster than a full decode
+            image.draft("RGB", (max_dimension, max_dimension))
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            if image_format == "jpeg" and image.mode != "RGB":
+                image = image.convert("RGB")
+            output = io.BytesIO()
+            image.save(output, format=image_format.upper(), quality=quality, optimize=True)
+            derived_size = image.size
+    except Exception as e:
+        return {"error": str(e)}
+
+    return {
+        "content": output.getvalue(),
+        "original_width": original_size[0],
+        "original_height": original_size[1],
+        "width": derived_size[0],
+        "height": derived_size[1]
+        }
+
+
+def get_derived_name(name: str, image_format: str) -> str:
+    return os.path.splitext(name)[0] + THUMBNAIL_FORMATS[image_format]
+
+
+def create_thumbnails(
+        archive_path: str,
+        max_dimension: int,
+        image_format: str = "jpeg",
+        quality: int = DEFAULT_QUALITY,
+        workers: int = None
+        ) -> str:
+    """
+    This function replaces the images of a zip file with smaller versions, resized and encoded in a
+    process pool. The resized images are written to the new zip as soon as every worker finishes, and
+    a manifest with the original and derived names, bytes and dimensions of every image is added.
+
+    Images that can't be decoded, or whose smaller version isn't smaller in bytes, are kept as they
+    are. The names of the images in the results file are the original names, the manifest maps them
+    to the files in the zip.
+
+    :param archive_path: The zip file created by `downloading.download_images`
+    :type archive_path: str
+    :param max_dimension: Maximum width and height in pixels of the images
+    :type max_dimension: int
+    :param image_format: "jpeg" or "webp"
+    :type image_format: str
+    :param quality: Encoder quality, from 1 to 95
+    :type quality: int
+    :param workers: Number of worker processes, defaults to the number of CPUs
+    :type workers: int
+    :return: the path of the zip file.
+    :raises ImportError: if Pillow isn't installed.
+    """
+    logging.info("Starting [thumbnails][create_thumbnails]")
+    # fail before starting the workers
+    import PIL
+
+    if image_format not in THUMBNAIL_FORMATS:
+        raise ValueError("image_format must be one of %s" % ", ".join(THUMBNAIL_FORMATS))
+
+    workers = workers or os.cpu_count() or 1
+    metrics = get_metrics()
+    manifest = []
+    tmp_path = archive_path + ".tmp"
+
+    try:
+        with zipfile.ZipFile(archive_path) as source, \
+                zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as target, \
+                ProcessPoolExecutor(max_workers=workers) as executor:
+            names = [name for name in source.namelist() if not name.endswith("/")]
+            pending = {}
+
+            def write_result(future) -> None:
+                name, content = pending.pop(future)
+                result = future.result()
+                entry = {"name": name, "original_bytes": len(content)}
+                if "error" in result:
+                    logging.error("Can't resize image %s. Reason: %s" % (name, result["error"]))
+                    entry.update({"file": name, "bytes": len(content), "error": result["error"]})
+                    target.writestr(name, content)
+                elif len(result["content"]) >= len(content):
+                    entry.update({
+                        "file": name,
+                        "bytes": len(content),
+                        "original_width": result["original_width"],
+                        "original_height": result["original_height"],
+                        "width": result["original_width"],
+                        "height": result["original_height"]
+                        })
+                    target.writestr(name, content)
+                else:
+                    derived_name = get_derived_name(name, image_format)
+                    entry.update({
+                        "file": derived_name,
+                        "bytes": len(result["content"]),
+                        "original_width": result["original_width"],
+                        "original_height": result["original_height"],
+                        "width": result["width"],
+                        "height": result["height"]
+                        })
+                    target.writestr(derived_name, result["content"])
+                metrics.count("thumbnail_original_bytes", entry["original_bytes"])
+                metrics.count("thumbnail_bytes", entry["bytes"])
+                manifest.append(entry)
+
+            for name in names:
+                content = source.read(name)
+                if name == DUPLICATES_FILE:
+                    target.writestr(name, content)
+                    continue
+
+                future = executor.submit(make_thumbnail, content, max_dimension, image_format, quality)
+                pending[future] = (name, content)
+                # wait for a free slot before reading the next image
+                while len(pending) >= workers * IMAGES_PER_WORKER:
+                    done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                    for finished in done:
+                        write_result(finished)
+
+            while len(pending) > 0:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for finished in done:
+                    write_result(finished)
+
+            manifest.sort(key=lambda entry: entry["name"])
+            target.writestr(MANIFEST_FILE, json.dumps({
+                "max_dimension": max_dimension,
+                "format": image_format,
+                "quality": quality,
+                "images": manifest
+                }, indent=2))
+
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    os.replace(tmp_path, archive_path)
+    logging.info(
+        "[thumbnails] %s images, %s bytes before, %s bytes after"
+        % (len(manifest), sum(entry["original_bytes"] for entry in manifest),
+           sum(entry["bytes"] for entry in manifest))
+        )
+    logging.info("Ending [thumbnails][create_thumbnails]")
+    return archive_path
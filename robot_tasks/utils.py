@@ -4,25 +4,47 @@ from RPA.Robocorp.WorkItems import WorkItems
 from RPA.Browser.Selenium import Selenium
 import logging
 
+def get_project_path() -> str:
+    """
+    This function returns the absolute path of the project root, the parent directory of
+    "robot_tasks".
+    """
+    dirname = os.path.dirname
+    return os.path.abspath(dirname(dirname((__file__))))
+
 def get_output_path() -> str:
     """
     This function returns the absolute path of the "output" directory located in the parent directory of
-    the current file.
+    the current file. The ROBOT_ARTIFACTS environment variable, set by rcc to the same directory,
+    can point it somewhere else, like the temporary directory of the benchmarks.
     :return: the absolute path to the "output" directory, which is a subdirectory of the parent
     directory of the directory where the current Python script is located.
     """
-    #instance dirname
-    path_to_save = "output"
+    artifacts_path = os.environ.get("ROBOT_ARTIFACTS")
+    if artifacts_path:
+        return os.path.abspath(artifacts_path)
 
     #instance dirname
-    dirname=os.path.dirname
+    path_to_save = "output"
 
-    # get absolute root path
-    base_path = os.path.abspath(dirname(dirname((__file__))))
-    output_dir = os.path.join(base_path, path_to_save)
+    output_dir = os.path.join(get_project_path(), path_to_save)
 
     return output_dir
 
+def get_cache_path(name: str) -> str:
+    """
+    This function returns the absolute path of a cache directory located in the ".cache" directory of
+    the project root. It lives outside "output" so it survives the cleaning done by `init_process`.
+
+    :param name: The name of the cache subdirectory
+    :type name: str
+    :return: the absolute path to the cache subdirectory.
+    """
+    base_path = get_project_path()
+    cache_dir = os.path.join(base_path, ".cache", name)
+
+    return cache_dir
+
 def clean_image_url(image_url: str) -> str:
     """
     The function takes an image URL and returns only the filename by removing the domain and any query
@@ -50,20 +72,42 @@ def clean_image_url(image_url: str) -> str:
 
 
 
-def get_variable(name: str) -> str:
+# Work items library and variables of the current input work item, read once by `get_payload`
+_work_items = None
+_payload = None
+
+def get_work_items() -> WorkItems:
     """
-    This function retrieves defined variables from WorkItems.
+    This function returns the WorkItems instance shared by the whole run. The first call loads the
+    first input work item.
+    """
+    global _work_items
+    if _work_items is None:
+        _work_items = WorkItems()
+        _work_items.get_input_work_item()
 
-    :param name: The name of the variable that we want to retrieve from the work item
-    :type name: str
-    :return: the value of the variable with the given name that is stored in the current work item.
+    return _work_items
+
+def get_payload() -> dict:
+    """
+    This function reads the variables of the current input work item. The work item is read only the
+    first time, later calls return the same variables until `reset_payload` is called.
+
+    :return: a dictionary with the work item variables.
     """
-    wi = WorkItems()
-    wi.get_input_work_item()
+    global _payload
+    if _payload is None:
+        _payload = get_work_items().get_work_item_variables()
 
-    variable = wi.get_work_item_variable(name)
+    return _payload
 
-    return variable
+def reset_payload() -> None:
+    """
+    This function forgets the cached variables, so the next `get_payload` reads the current input work
+    item again. It is used after moving to the next input work item.
+    """
+    global _payload
+    _payload = None
 
 def get_screenshot_path() -> str:
     """
@@ -105,9 +149,9 @@ def accept_cookies(browser: Selenium) ->  None:
     :type browser: Selenium
     """
     accept_button = "//button[@data-testid='GDPR-accept']"
-    try:
-        browser.page_should_contain_element(accept_button)
-        browser.click_button(accept_button)
-        browser.reload_page()
-    except AssertionError:
-        logging.error("Can't find cookies button")
\ No newline at end of file
+    # already accepted in this session or in a persistent profile, no click nor reload needed
+    if browser.get_element_count(accept_button) == 0:
+        logging.info("Cookies already accepted or button not shown")
+        return
+    browser.click_button(accept_button)
+    browser.reload_page()
\ No newline at end of file
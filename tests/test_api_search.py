@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from robot_tasks import api_search
+from robot_tasks.api_search import format_date, search_news_api, get_news_data_from_api
+from robot_tasks.config import RunConfig
+
+from benchmarks.fixture_api import FixtureApi
+
+
+@pytest.fixture
+def api_env(monkeypatch):
+    """
+    Point the HTTP backend to a stand-in server, the test sets it with `use`
+    """
+    monkeypatch.setenv("NYT_API_KEY", "test-key")
+    sleeps = []
+    monkeypatch.setattr(api_search.time, "sleep", sleeps.append)
+
+    def use(api: FixtureApi) -> list:
+        monkeypatch.setenv("NYT_SEARCH_URL", api.url)
+        return sleeps
+
+    return use
+
+
+@pytest.mark.parametrize("pub_date, expected", [
+    ("2023-04-18T11:50:00+0000", "10m ago"),
+    ("2023-04-18T09:00:12+0000", "2h ago"),
+    ("2023-04-03T09:00:12+0000", "April 3"),
+    ("2023-01-05T09:00:12+0000", "Jan. 5"),
+    ("2022-09-03T09:00:12+0000", "Sept. 3, 2022"),
+    ])
+def test_format_date_like_the_results_page(pub_date, expected):
+    now = datetime(2023, 4, 18, 12, 0, tzinfo=timezone.utc)
+    assert format_date(pub_date, now) == expected
+
+
+def test_pages_until_a_short_page(api_env):
+    with FixtureApi() as api:
+        api_env(api)
+        data = search_news_api("economy", 1, ["Business"])
+
+    assert len(data) == 23
+    assert [params["page"] for params in api.requests] == ["0", "1", "2"]
+    first = api.requests[0]
+    assert first["q"] == "economy"
+    assert first["sort"] == "newest"
+    assert first["api-key"] == "test-key"
+    assert 'section_name:("Business")' in first["fq"]
+
+    title, news_date, description, image = data[0]
+    assert title == "What to Know About Inflation This Week"
+    assert news_date == "March 28, 2023"
+    assert description == "Economists weighed in on inflation, with $12 million at stake."
+    assert image == (
+        "https://static01.nyt.com/images/2023/03/28/multimedia/28inflatio/28inflatio-articleLarge.jpg")
+
+
+def test_stops_paging_at_max_results(api_env):
+    with FixtureApi() as api:
+        api_env(api)
+        data = search_news_api("economy", 1, [], max_results=10)
+
+    assert len(data) == 10
+    assert len(api.requests) == 1
+
+
+def test_waits_retry_after_when_rate_limited(api_env):
+    with FixtureApi(rate_limited_pages=[1], retry_after=3) as api:
+        sleeps = api_env(api)
+        data = search_news_api("economy", 1, [])
+
+    assert len(data) == 23
+    assert [params["page"] for params in api.requests] == ["0", "1", "1", "2"]
+    assert sleeps == [3]
+
+
+def test_falls_back_to_the_browser_when_the_endpoint_fails(api_env):
+    config = RunConfig(search="economy", category_or_section=[], months=1, backend="http")
+    with FixtureApi(status=500) as api:
+        api_env(api)
+        assert get_news_data_from_api(config) is None
+    assert len(api.requests) == 1
+
+
+def test_falls_back_to_the_browser_without_api_key(api_env, monkeypatch):
+    config = RunConfig(search="economy", category_or_section=[], months=1, backend="http")
+    with FixtureApi() as api:
+        api_env(api)
+        monkeypatch.delenv("NYT_API_KEY")
+        assert get_news_data_from_api(config) is None
+    assert api.requests == []
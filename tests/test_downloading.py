@@ -0,0 +1,297 @@
+import os
+import time
+import json
+import hashlib
+import zipfile
+import threading
+import http.server
+
+import pytest
+
+from robot_tasks import downloading
+from robot_tasks.caching import ImageCache
+from robot_tasks.downloading import (
+    CircuitBreaker, FolderWriter, ImageDownloader, ZipWriter, download_images
+    )
+
+
+class ImageServer:
+    """
+    Stand-in of the image host. Every image has different content and an ETag, `statuses` sets the
+    error statuses answered by an image before it is served
+    """
+    def __init__(self):
+        self.statuses = {}
+        self.down = False
+        self.delay = 0
+        self.cache_control = None
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self.server = None
+
+    def url(self, name: str) -> str:
+        return "http://127.0.0.1:%s/images/%s" % (self.server.server_port, name)
+
+    def count(self, name: str) -> int:
+        return sum(1 for path, _ in self.requests if path == "/images/" + name)
+
+    def handle(self, path: str, headers) -> tuple:
+        with self.lock:
+            self.requests.append((path, dict(headers)))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            statuses = self.statuses.get(path.rsplit("/", 1)[-1])
+            status = statuses.pop(0) if statuses else None
+        try:
+            time.sleep(self.delay)
+            if self.down:
+                return 503, {}, b"down"
+            if status is not None:
+                return status, {}, b"error"
+
+            body = path.encode() * 64
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            response_headers = {"ETag": etag}
+            if self.cache_control is not None:
+                response_headers["Cache-Control"] = self.cache_control
+            if headers.get("If-None-Match") == etag:
+                return 304, response_headers, b""
+            return 200, response_headers, body
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def start(self) -> "ImageServer":
+        site = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                status, headers, body = site.handle(self.path, self.headers)
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    # no waits between attempts, and the output directory of download_images in the test folder
+    monkeypatch.setattr(downloading, "get_backoff", lambda attempt, error=None: 0)
+    monkeypatch.setenv("ROBOT_ARTIFACTS", str(tmp_path / "output"))
+    os.makedirs(tmp_path / "output" / "images")
+    image_server = ImageServer().start()
+    yield image_server
+    image_server.stop()
+
+
+def fetch_all(downloader: ImageDownloader, data: list, folder) -> int:
+    os.makedirs(folder, exist_ok=True)
+    try:
+        return downloader.download_all(data, FolderWriter(str(folder)))
+    finally:
+        downloader.close()
+
+
+def test_connections_per_host_limit(server, tmp_path):
+    server.delay = 0.1
+    data = [["%s.jpg" % index, server.url("%s.jpg" % index)] for index in range(8)]
+
+    saved = fetch_all(ImageDownloader(workers=8, connections_per_host=2), data, tmp_path)
+
+    assert saved == 8
+    assert server.max_active <= 2
+    assert sorted(os.listdir(tmp_path)) == sorted(name for name, _ in data + [["output", None]])
+
+
+def test_rows_without_image_are_skipped(server, tmp_path):
+    downloader = ImageDownloader(workers=2)
+    saved = fetch_all(downloader, [["a.jpg", server.url("a.jpg")], ["b.jpg", "N/A"]], tmp_path)
+
+    assert saved == 1
+    assert len(server.requests) == 1
+    assert downloader.failures == {}
+
+
+def test_timeout_is_retried_and_recorded(server, tmp_path):
+    server.delay = 0.5
+    downloader = ImageDownloader(workers=1, timeout=(1, 0.1), max_attempts=2)
+
+    assert fetch_all(downloader, [["a.jpg", server.url("a.jpg")]], tmp_path) == 0
+    failure = downloader.failures["a.jpg"]
+    assert failure["error"] == "ReadTimeout"
+    assert failure["attempts"] == 2
+    assert failure["retryable"] is True
+    assert not os.path.exists(tmp_path / "a.jpg")
+    assert not os.path.exists(tmp_path / "a.jpg.part")
+
+
+def test_404_is_not_retried(server, tmp_path):
+    server.statuses["a.jpg"] = [404] * 3
+    downloader = ImageDownloader(workers=1, max_attempts=3)
+
+    assert fetch_all(downloader, [["a.jpg", server.url("a.jpg")]], tmp_path) == 0
+    assert server.count("a.jpg") == 1
+    assert downloader.failures["a.jpg"] == {
+        "url": server.url("a.jpg"), "error": "HTTP 404", "attempts": 1, "retryable": False}
+
+
+def test_5xx_is_retried_up_to_max_attempts(server, tmp_path):
+    server.statuses["a.jpg"] = [503, 500]
+    server.statuses["b.jpg"] = [503] * 3
+    downloader = ImageDownloader(workers=1, max_attempts=3)
+
+    data = [["a.jpg", server.url("a.jpg")], ["b.jpg", server.url("b.jpg")]]
+    assert fetch_all(downloader, data, tmp_path) == 1
+    assert server.count("a.jpg") == 3
+    assert server.count("b.jpg") == 3
+    assert list(downloader.failures) == ["b.jpg"]
+    assert downloader.failures["b.jpg"]["attempts"] == 3
+
+
+def test_circuit_opens_and_closes(server, tmp_path):
+    breaker = CircuitBreaker(threshold=2, cooldown=0.2)
+    downloader = ImageDownloader(workers=1, max_attempts=1, breaker=breaker)
+    server.down = True
+
+    data = [["%s.jpg" % index, server.url("%s.jpg" % index)] for index in range(3)]
+    assert fetch_all(downloader, data, tmp_path) == 0
+    # the third image failed without a request
+    assert len(server.requests) == 2
+    assert downloader.failures["2.jpg"]["error"] == "circuit open"
+
+    server.down = False
+    time.sleep(0.25)
+    downloader = ImageDownloader(workers=1, max_attempts=1, breaker=breaker)
+    assert fetch_all(downloader, [["3.jpg", server.url("3.jpg")]], tmp_path) == 1
+    assert breaker.opened_at == {}
+    assert breaker.failures == {}
+
+
+def test_404_closes_a_half_open_circuit(server, tmp_path):
+    breaker = CircuitBreaker(threshold=1, cooldown=0.1)
+    server.statuses["a.jpg"] = [503]
+    server.statuses["b.jpg"] = [404]
+    downloader = ImageDownloader(workers=1, max_attempts=1, breaker=breaker)
+
+    fetch_all(downloader, [["a.jpg", server.url("a.jpg")]], tmp_path)
+    assert len(breaker.opened_at) == 1
+
+    time.sleep(0.15)
+    downloader = ImageDownloader(workers=1, max_attempts=1, breaker=breaker)
+    data = [["b.jpg", server.url("b.jpg")], ["c.jpg", server.url("c.jpg")]]
+    assert fetch_all(downloader, data, tmp_path) == 1
+    assert breaker.opened_at == {}
+    assert downloader.failures["b.jpg"]["error"] == "HTTP 404"
+
+
+def test_cache_hit_without_request(server, tmp_path):
+    cache = ImageCache(str(tmp_path / "cache"))
+    for folder in ["first", "second"]:
+        fetch_all(ImageDownloader(workers=1, cache=cache), [["a.jpg", server.url("a.jpg")]],
+                  tmp_path / folder)
+
+    assert server.count("a.jpg") == 1
+    assert cache.stats == {"hits": 1, "revalidated": 0, "misses": 1}
+    assert (tmp_path / "first" / "a.jpg").read_bytes() == (tmp_path / "second" / "a.jpg").read_bytes()
+
+
+def test_cache_revalidates_with_etag(server, tmp_path):
+    server.cache_control = "max-age=0"
+    cache = ImageCache(str(tmp_path / "cache"))
+    for folder in ["first", "second"]:
+        fetch_all(ImageDownloader(workers=1, cache=cache), [["a.jpg", server.url("a.jpg")]],
+                  tmp_path / folder)
+
+    assert server.count("a.jpg") == 2
+    assert "If-None-Match" not in server.requests[0][1]
+    assert server.requests[1][1]["If-None-Match"].startswith('"')
+    assert cache.stats == {"hits": 0, "revalidated": 1, "misses": 1}
+    assert (tmp_path / "second" / "a.jpg").exists()
+
+
+def test_cache_evicts_the_least_recently_used(server, tmp_path):
+    size = len(b"/images/a.jpg" * 64)
+    cache = ImageCache(str(tmp_path / "cache"), max_bytes=size * 2)
+    data = [[name, server.url(name)] for name in ["a.jpg", "b.jpg", "c.jpg"]]
+    fetch_all(ImageDownloader(workers=1, cache=cache), data, tmp_path / "images")
+
+    assert cache.lookup(server.url("a.jpg")) is None
+    assert cache.lookup(server.url("c.jpg")) is not None
+    assert len(os.listdir(tmp_path / "cache" / "objects")) == 2
+
+
+def test_cache_object_removed_by_another_run_is_a_miss(server, tmp_path):
+    cache = ImageCache(str(tmp_path / "cache"))
+    fetch_all(ImageDownloader(workers=1, cache=cache), [["a.jpg", server.url("a.jpg")]],
+              tmp_path / "first")
+    for name in os.listdir(tmp_path / "cache" / "objects"):
+        os.unlink(tmp_path / "cache" / "objects" / name)
+
+    downloader = ImageDownloader(workers=1, cache=cache)
+    assert fetch_all(downloader, [["a.jpg", server.url("a.jpg")]], tmp_path / "second") == 1
+    assert downloader.failures == {}
+    assert cache.stats["misses"] == 2
+
+
+def test_cache_index_is_merged_between_runs(tmp_path):
+    first = ImageCache(str(tmp_path))
+    second = ImageCache(str(tmp_path))
+    first.store("http://host/a.jpg", [b"a"], {})
+    second.store("http://host/b.jpg", [b"b"], {})
+    first.close()
+    second.close()
+
+    assert sorted(ImageCache(str(tmp_path)).index) == ["http://host/a.jpg", "http://host/b.jpg"]
+
+
+@pytest.mark.parametrize("stream_to_zip", [True, False])
+def test_zip_lists_every_image(server, tmp_path, stream_to_zip):
+    data = [["%s.jpg" % index, server.url("%s.jpg" % index)] for index in range(12)]
+    data.append(["missing.jpg", "N/A"])
+
+    archive_path = download_images(data, workers=4, stream_to_zip=stream_to_zip, use_cache=False)
+
+    with zipfile.ZipFile(archive_path) as archive:
+        assert sorted(archive.namelist()) == sorted("%s.jpg" % index for index in range(12))
+        assert archive.read("3.jpg") == b"/images/3.jpg" * 64
+
+
+def test_zip_writer_resumes_an_archive(server, tmp_path):
+    zip_path = str(tmp_path / "images.zip")
+    server.statuses["b.jpg"] = [404]
+    data = [[name, server.url(name)] for name in ["a.jpg", "b.jpg"]]
+    downloader = ImageDownloader(workers=1)
+    writer = ZipWriter(zip_path, append=True)
+    downloader.download_all(data, writer)
+    writer.close()
+
+    writer = ZipWriter(zip_path, append=True)
+    writer.write("copy.jpg", [b"/images/a.jpg" * 64])
+    downloader.download_all(data, writer)
+    writer.close()
+    downloader.close()
+
+    assert server.count("a.jpg") == 1
+    assert server.count("b.jpg") == 2
+    with zipfile.ZipFile(zip_path) as archive:
+        assert sorted(archive.namelist()) == ["a.jpg", "b.jpg", "duplicates.json"]
+        assert json.loads(archive.read("duplicates.json")) == {"copy.jpg": "a.jpg"}
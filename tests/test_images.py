@@ -0,0 +1,44 @@
+import pytest
+
+from robot_tasks.images import split_image_url, get_image_name, ImageIdentity
+
+IMAGES_URL = "https://static01.nyt.com/images/2023/04/18/multimedia/18ai/"
+
+
+@pytest.mark.parametrize("name, stem, rendition", [
+    ("18ai-threeByTwoSmallAt2X.jpg", "18ai", "threeByTwoSmallAt2X"),
+    ("18ai-articleLarge.jpg", "18ai", "articleLarge"),
+    ("18ai-mediumThreeByTwo440.jpg", "18ai", "mediumThreeByTwo440"),
+    ("18ai-mobileMasterAt3X.jpg", "18ai", "mobileMasterAt3X"),
+    ("18ai-superJumbo.jpg", "18ai", "superJumbo"),
+    ("foo-slides.jpg", "foo-slides", None),
+    ("happy-mothers.jpg", "happy-mothers", None),
+    ("world-squared.jpg", "world-squared", None),
+    ("18ai-jumboFoo.jpg", "18ai-jumboFoo", None),
+    ])
+def test_split_image_url_renditions(name, stem, rendition):
+    parts = split_image_url(IMAGES_URL + name + "?quality=75&auto=webp")
+
+    assert parts["stem"] == stem
+    assert parts["rendition"] == rendition
+    assert parts["extension"] == ".jpg"
+
+
+def test_renditions_share_the_image_name():
+    small = IMAGES_URL + "18ai-threeByTwoSmallAt2X.jpg?quality=75"
+    large = IMAGES_URL + "18ai-superJumbo.jpg"
+
+    assert get_image_name(small) == get_image_name(large)
+    assert get_image_name(IMAGES_URL + "foo-slides.jpg") != get_image_name(IMAGES_URL + "foo.jpg")
+
+
+def test_image_identity_keeps_the_preferred_rendition():
+    identity = ImageIdentity()
+    small = IMAGES_URL + "18ai-threeByTwoSmallAt2X.jpg"
+    large = IMAGES_URL + "18ai-superJumbo.jpg"
+
+    names, images_data = identity.add_batch([large, "N/A", small])
+
+    assert images_data == [[get_image_name(small), small]]
+    assert names == [get_image_name(small), "N/A", get_image_name(small)]
+    assert identity.duplicates == 1
@@ -0,0 +1,199 @@
+import re
+from datetime import date
+from urllib.parse import urljoin
+
+import pytest
+from lxml import html
+
+from robot_tasks.parsing import (
+    parse_srcset, resolve_srcset, choose_image_url, build_news_data, parse_results,
+    parse_results_file, parse_result_date, format_result_date
+    )
+from robot_tasks.scraping import get_data_from_entries, get_data_from_page_source
+
+from benchmarks.fixture_site import FixtureSite
+
+
+@pytest.mark.parametrize("srcset", [
+    "a.jpg 600w, b.jpg 1200w",
+    "a.jpg 600w,b.jpg 1200w",
+    " a.jpg 600w ,\n b.jpg 1200w, ",
+    ])
+def test_parse_srcset_with_and_without_spaces_after_commas(srcset):
+    assert parse_srcset(srcset) == [("a.jpg", 600, None), ("b.jpg", 1200, None)]
+
+
+def test_parse_srcset_keeps_commas_inside_urls():
+    assert parse_srcset("/a.jpg?crop=0,0,600 1x,/b.jpg 2x") == [
+        ("/a.jpg?crop=0,0,600", None, 1.0),
+        ("/b.jpg", None, 2.0)
+        ]
+
+
+def test_resolve_srcset_without_spaces_after_commas():
+    resolved = resolve_srcset("a.jpg 600w,/b.jpg 1200w", "https://www.nytimes.com/search/")
+    assert resolved == (
+        "https://www.nytimes.com/search/a.jpg 600w, https://www.nytimes.com/b.jpg 1200w")
+
+
+def test_choose_image_url_uses_a_compact_srcset():
+    assert choose_image_url("src.jpg", "a.jpg 600w,b.jpg 1200w", None, 1000) == "b.jpg"
+
+
+TODAY = date(2023, 4, 18)
+SITE_URL = "http://127.0.0.1:8000/search?query=economy"
+
+
+def render_page(results: int) -> str:
+    return FixtureSite(results).render_page(results, False)
+
+
+def test_parse_results_of_the_fixture_site():
+    data = parse_results(render_page(3), SITE_URL, target_width=1000)
+
+    assert len(data) == 3
+    title, news_date, description, image = data[0]
+    assert title == "Benchmark result 0 about the economy"
+    assert parse_result_date(news_date) == date.today()
+    assert description == "The company raised $1 million in a new funding round."
+    # relative srcset urls are resolved against the url of the page
+    assert image == (
+        "http://127.0.0.1:8000/images/result-0-threeByTwoMediumAt2X.jpg?quality=75&auto=webp")
+
+
+def test_parse_results_resolves_src_without_srcset():
+    page = render_page(1).replace("srcset=", "data-srcset=")
+    data = parse_results(page, SITE_URL)
+
+    assert data[0][3] == (
+        "http://127.0.0.1:8000/images/result-0-threeByTwoMediumAt2X.jpg?quality=75&auto=webp")
+
+
+def test_parse_results_without_description_nor_image():
+    page = render_page(1)
+    page = re.sub(r'<p class="css-16nhkrn">.*?</p>', "", page)
+    page = re.sub(r"<figure>.*?</figure>", "", page, flags=re.DOTALL)
+
+    assert parse_results(page, SITE_URL)[0][2:] == ["N/A", "N/A"]
+
+
+def test_parse_results_skips_results_without_title_or_date():
+    page = render_page(3)
+    page = page.replace("<h4>Benchmark result 0 about the economy</h4>", "", 1)
+    page = page.replace('<span data-testid="todays-date">', "<span>", 2)
+
+    assert [row[0] for row in parse_results(page, SITE_URL)] == [
+        "Benchmark result 2 about the economy"]
+
+
+def test_parse_results_removes_duplicates():
+    site = FixtureSite(2)
+    page = site.render_page(2, False).replace(
+        "</ol>", site.rendered[0] + site.rendered[1] + "</ol>")
+
+    assert [row[0] for row in parse_results(page, SITE_URL)] == [
+        "Benchmark result 0 about the economy",
+        "Benchmark result 1 about the economy"
+        ]
+
+
+def test_parse_results_file(tmp_path):
+    path = tmp_path / "search.html"
+    path.write_text(render_page(4), encoding="utf-8")
+
+    assert parse_results_file(str(path), SITE_URL) == parse_results(render_page(4), SITE_URL)
+
+
+def test_build_news_data_missing_fields():
+    rows = [
+        {"title": "A", "date": "April 3", "description": None, "image": None},
+        {"title": None, "date": "April 3", "description": "B", "image": "b.jpg"},
+        {"title": "C", "date": None, "description": "C", "image": "c.jpg"},
+        {"title": "A", "date": "April 3", "description": "again", "image": "a.jpg"},
+        {"title": "D", "date": "April 2", "description": "D", "image": "data:image/gif;base64,R0"},
+        ]
+
+    assert build_news_data(rows) == [
+        ["A", "April 3", "N/A", "N/A"],
+        ["D", "April 2", "D", "N/A"]
+        ]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("5h ago", TODAY),
+    ("10m ago", TODAY),
+    ("April 3", date(2023, 4, 3)),
+    ("Sept. 3", date(2022, 9, 3)),
+    ("Sept. 3, 2021", date(2021, 9, 3)),
+    ("Jan. 5", date(2023, 1, 5)),
+    ("Dec.  24", date(2022, 12, 24)),
+    ("April 18", TODAY),
+    ("April 19", date(2022, 4, 19)),
+    ("yesterday", None),
+    ("Smarch 3", None),
+    ])
+def test_parse_result_date(text, expected):
+    assert parse_result_date(text, TODAY) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    (date(2023, 4, 3), "April 3"),
+    (date(2023, 3, 3), "March 3"),
+    (date(2023, 1, 5), "Jan. 5"),
+    (date(2022, 9, 3), "Sept. 3, 2022"),
+    ])
+def test_format_result_date(value, expected):
+    assert format_result_date(value, TODAY) == expected
+    assert parse_result_date(expected, TODAY) == value
+
+
+class ScriptDriver:
+    """
+    Stand-in of the WebDriver that runs the queries of EXTRACT_RESULTS_SCRIPT with lxml, and resolves
+    `src` like the `image.src` property of the browser
+    """
+    def __init__(self, page_source: str, base_url: str):
+        self.document = html.fromstring(page_source)
+        self.base_url = base_url
+
+    def execute_script(self, script, main, title, news_date, image, description, start):
+        def text(item, xpath):
+            found = item.xpath(xpath)
+            return " ".join(found[0].text_content().split()) if found else None
+
+        rows = []
+        for item in self.document.xpath(main)[start:]:
+            images = item.xpath(image)
+            element = images[0] if images else None
+            rows.append({
+                "title": text(item, title),
+                "date": text(item, news_date),
+                "description": text(item, description),
+                "image": urljoin(self.base_url, element.get("src")) if element is not None else None,
+                "srcset": element.get("srcset") if element is not None else None,
+                "sizes": element.get("sizes") if element is not None else None
+                })
+        return [self.base_url, rows]
+
+
+class ScriptBrowser:
+    def __init__(self, page_source: str, base_url: str):
+        self.driver = ScriptDriver(page_source, base_url)
+        self.page_source = page_source
+        self.base_url = base_url
+
+    def get_source(self) -> str:
+        return self.page_source
+
+    def get_location(self) -> str:
+        return self.base_url
+
+
+@pytest.mark.parametrize("target_width", [None, 600, 1000, 4000])
+def test_parse_results_matches_the_script_extraction(target_width):
+    browser = ScriptBrowser(render_page(12), SITE_URL)
+
+    expected = get_data_from_entries(browser, target_width)
+    assert len(expected) == 12
+    assert parse_results(browser.get_source(), SITE_URL, target_width) == expected
+    assert get_data_from_page_source(browser, target_width) == expected